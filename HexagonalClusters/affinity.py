@@ -0,0 +1,161 @@
+# Optional import stage: group elicited information by affinity before it reaches the board, and lay
+# each group out as a pre-docked cluster on the hexagon lattice. Texts are turned into sparse, hashed
+# TF-IDF vectors in one streaming pass, and grouped with mini-batch spherical k-means, which only ever
+# holds one batch of documents and the k centroids in memory (no document-by-document similarities)
+import math
+import re
+import zlib
+
+import numpy as np
+
+from lattice import axial_round, axial_to_pixel, pixel_to_axial, spiral, spiral_radius
+
+token_pattern = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+stop_words = frozenset("""
+a about all also an and any are as at be been but by can could do does for from has have how i if in
+into is it its more most must no not of on or our should so than that the their them there these they
+this to too up us was we were what when where which who why will with would you your
+""".split())
+
+
+# Sparse hashed term counts of many texts, in compressed sparse row form: the hashed feature
+# indices of document i are indices[indptr[i]:indptr[i + 1]], with their counts in data
+class HashedCounts:
+    def __init__(self, texts, n_features):
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            counts = {}
+            for token in token_pattern.findall(text.lower()):
+                if token not in stop_words:
+                    feature = zlib.crc32(token.encode()) % n_features
+                    counts[feature] = counts.get(feature, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        self.n_features = n_features
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.data = np.array(data, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    # Sub-linear TF-IDF weights, L2-normalized per document, for all documents at once
+    def tfidf(self):
+        document_frequency = np.bincount(self.indices, minlength=self.n_features)
+        idf = np.log((1 + len(self)) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(self.data)) * idf[self.indices]
+        row_lengths = np.diff(self.indptr)
+        rows = np.repeat(np.arange(len(self)), row_lengths)
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(self)))
+        self.data = (weights / np.maximum(norms[rows], 1e-12)).astype(np.float32)
+
+    # Indices, weights and row lengths of the documents start:stop
+    def batch(self, start, stop):
+        first, last = self.indptr[start], self.indptr[stop]
+        return self.indices[first:last], self.data[first:last], np.diff(self.indptr[start:stop + 1])
+
+
+# Cosine similarity of every document of a batch to every centroid: (k, batch size). Only the
+# non-zero features of each document are looked at
+def similarities(centroids, indices, weights, row_lengths):
+    result = np.zeros((centroids.shape[0], len(row_lengths)), dtype=np.float32)
+    non_empty = row_lengths > 0
+    if indices.size:
+        gathered = centroids[:, indices] * weights
+        starts = np.concatenate(([0], np.cumsum(row_lengths)[:-1]))[non_empty]
+        result[:, non_empty] = np.add.reduceat(gathered, starts, axis=1)
+    return result
+
+
+# Mini-batch spherical k-means over the rows of counts; returns one label per document
+# (-1 for documents without any usable word)
+def minibatch_kmeans(counts, n_clusters, batch_size=1024, epochs=2, seed=0):
+    random = np.random.default_rng(seed)
+    documents = len(counts)
+    non_empty = np.flatnonzero(np.diff(counts.indptr) > 0)
+    if non_empty.size == 0:
+        return np.full(documents, -1)
+    n_clusters = min(n_clusters, non_empty.size)
+
+    # Start from randomly chosen documents
+    centroids = np.zeros((n_clusters, counts.n_features), dtype=np.float32)
+    for cluster, document in enumerate(random.choice(non_empty, n_clusters, replace=False)):
+        indices, weights, _ = counts.batch(document, document + 1)
+        centroids[cluster, indices] = weights
+    seen = np.zeros(n_clusters)
+
+    # Each batch moves its documents' centroids towards them, by less and less as they see more
+    for _ in range(epochs):
+        for start in random.permutation(range(0, documents, batch_size)):
+            stop = min(start + batch_size, documents)
+            indices, weights, row_lengths = counts.batch(start, stop)
+            labels = similarities(centroids, indices, weights, row_lengths).argmax(axis=0)
+            labels = labels[row_lengths > 0]
+            row_lengths = row_lengths[row_lengths > 0]
+            if labels.size == 0:
+                continue
+
+            assigned = np.bincount(labels, minlength=n_clusters)
+            total = seen + assigned
+            scale = np.divide(seen, total, out=np.ones(n_clusters), where=total > 0)
+            centroids *= scale[:, None].astype(np.float32)
+            feature_labels = np.repeat(labels, row_lengths)
+            np.add.at(centroids, (feature_labels, indices), weights / total[feature_labels].astype(np.float32))
+            seen = total
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    # Final assignment, batch by batch
+    labels = np.empty(documents, dtype=np.int64)
+    for start in range(0, documents, batch_size):
+        stop = min(start + batch_size, documents)
+        indices, weights, row_lengths = counts.batch(start, stop)
+        batch_labels = similarities(centroids, indices, weights, row_lengths).argmax(axis=0)
+        batch_labels[row_lengths == 0] = -1
+        labels[start:stop] = batch_labels
+    return labels
+
+
+# Group texts by affinity; returns lists of text indices, in order of each group's first text.
+# n_clusters defaults to about the square root of half the number of texts
+def affinity_groups(texts, n_clusters=None, n_features=2 ** 14, batch_size=1024, seed=0):
+    counts = HashedCounts(texts, n_features)
+    counts.tfidf()
+    if n_clusters is None:
+        n_clusters = max(1, round(math.sqrt(len(counts) / 2)))
+
+    groups = {}
+    for index, label in enumerate(minibatch_kmeans(counts, n_clusters, batch_size, seed=seed)):
+        groups.setdefault(int(label), []).append(index)
+    return list(groups.values())
+
+
+# Initial layout by affinity: each group of similar texts becomes a compact spiral of docked
+# hexagons, and the groups are packed in rows (one hexagon apart) starting at (margin, margin).
+# Group centers are rounded to lattice cells, so the layout also suits lattice mode (see Board.lattice).
+# Rows are at least width wide, and wider for large boards so that the board stays roughly square.
+# Yields (x, y, text) ready for Board.add_many
+def affinity_layout(texts, width, size=55, margin=100, **grouping):
+    texts = list(texts)
+    groups = affinity_groups(texts, **grouping)
+    cell_width = math.sqrt(3) * size
+    footprints = [((2 * spiral_radius(len(group)) + 1) * cell_width,
+                   (2 * spiral_radius(len(group)) + 1) * 1.5 * size + size / 2) for group in groups]
+    row_width = max(width - 2 * margin, math.sqrt(sum(w * h for w, h in footprints)))
+
+    x = y = row_height = 0
+    for group, (group_width, group_height) in zip(groups, footprints):
+        if x > 0 and x + group_width > row_width:
+            x = 0
+            y += row_height + cell_width
+            row_height = 0
+        center_x, center_y = axial_to_pixel(*axial_round(*pixel_to_axial(margin + x + group_width / 2,
+                                                                         margin + y + group_height / 2, size)), size)
+        for index, (q, r) in zip(group, spiral(len(group))):
+            offset_x, offset_y = axial_to_pixel(q, r, size)
+            yield center_x + offset_x, center_y + offset_y, texts[index]
+        x += group_width + cell_width
+        row_height = max(row_height, group_height)
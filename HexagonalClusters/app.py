@@ -2,35 +2,124 @@
 
 import tkinter as tk
 from hexagon import Hexagon
+from background_export import BackgroundExport
 
 
 class HexagonClusterApp:
-    def __init__(self, root, width, height):
+    def __init__(self, root, width, height, board=None, instrumentation=None):
         self.root = root
         self.root.title("Hexagonal Clusters")
         self.width = width
         self.height = height
 
-        # Create a canvas to draw on
-        self.canvas = tk.Canvas(self.root, width=self.width, height=self.height, bg='white')
-        self.canvas.pack(padx=10, pady=10)
+        # Create a scrollable canvas to draw on; every change of view (scrolling, panning,
+        # resizing) is reported to the hexagon drawer so it can draw what came into view
+        board = tk.Frame(self.root)
+        board.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(board, width=self.width, height=self.height, bg='white')
+        self.x_scrollbar = tk.Scrollbar(board, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.y_scrollbar = tk.Scrollbar(board, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(xscrollcommand=self.on_x_scroll, yscrollcommand=self.on_y_scroll)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        self.y_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.x_scrollbar.grid(row=1, column=0, sticky='ew')
+        board.rowconfigure(0, weight=1)
+        board.columnconfigure(0, weight=1)
 
-        # Initialize HexagonDrawer
-        self.hexagon_drawer = Hexagon(self.canvas)
+        # Initialize HexagonDrawer, on a new board unless one is given (e.g. loaded from a session)
+        self.hexagon_drawer = Hexagon(self.canvas, board, instrumentation)
+        self.setup_navigation()
+
+        # Time the app's own handlers too, if instrumented
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.instrument_app(self)
+
+    def on_x_scroll(self, first, last):
+        self.x_scrollbar.set(first, last)
+        self.hexagon_drawer.schedule_viewport()
+
+    def on_y_scroll(self, first, last):
+        self.y_scrollbar.set(first, last)
+        self.hexagon_drawer.schedule_viewport()
+
+    # Mouse wheel scrolls (with Shift: horizontally), Ctrl + mouse wheel zooms around the pointer,
+    # and dragging with the middle button pans the board
+    def setup_navigation(self):
+        self.canvas.bind('<MouseWheel>', lambda event: self.on_mouse_wheel(event, 1 if event.delta > 0 else -1))
+        self.canvas.bind('<Button-4>', lambda event: self.on_mouse_wheel(event, 1))  # X11 wheel up
+        self.canvas.bind('<Button-5>', lambda event: self.on_mouse_wheel(event, -1))  # X11 wheel down
+        self.canvas.bind('<ButtonPress-2>', lambda event: self.canvas.scan_mark(event.x, event.y))
+        self.canvas.bind('<B2-Motion>', lambda event: self.canvas.scan_dragto(event.x, event.y, gain=1))
+
+    def on_mouse_wheel(self, event, direction):
+        if event.state & 0x4:  # Control
+            self.hexagon_drawer.zoom_by(1.25 if direction > 0 else 0.8, event.x, event.y)
+        elif event.state & 0x1:  # Shift
+            self.canvas.xview_scroll(-direction, 'units')
+        else:
+            self.canvas.yview_scroll(-direction, 'units')
 
     def add_hexagon(self, x, y, text):
         # Use HexagonDrawer to draw a hexagon
         self.hexagon_drawer.draw(x, y, text)
 
-    # Grab the arranged hexagons into a postscript (see Hexagon.cluster_ps_file attribute)
-    # and include this postscript into an onload js call
-    # inside an html rendering (html file name inside the Hexagon.export_to_html() method)
+    # Add many hexagons in one go from an iterable of (x, y, text); canvas items are only
+    # created for the hexagons in view
+    def add_hexagons(self, items):
+        self.hexagon_drawer.draw_many(items)
+
+    # Add hexagons batch by batch from an iterable of iterables of (x, y, text), one batch per turn
+    # of the Tk event loop, so the board shows (and responds) while the rest is still being read
+    def add_hexagons_incrementally(self, batches):
+        batches = iter(batches)
+
+        def add_next_batch():
+            batch = next(batches, None)
+            if batch is not None:
+                self.add_hexagons(batch)
+                self.root.after(1, add_next_batch)
+        self.root.after_idle(add_next_batch)
+
+    # Export the arranged hexagons to SVG, to an HTML page with the SVG inline and to PNG
+    # (file names are the Hexagon.cluster_svg_file, html_file and cluster_png_file attributes).
+    # Only the snapshot is taken here; the files are written on a worker thread, and clicking
+    # again while an export runs cancels it in favour of a fresh one
     def export_to_html(self):
-        self.hexagon_drawer.export_to_html(self.width, self.height)
+        if self.background_export.running:
+            self.export_status.config(text="Restarting export...")
+        self.background_export.start(self.hexagon_drawer.export_job(self.width, self.height))
+
+    def on_export_progress(self, done, total):
+        self.export_status.config(text=f"Exporting... {100 * done // max(total, 1)}%")
+
+    def on_export_done(self, paths):
+        self.export_status.config(text=f"Exported to {', '.join(paths)}")
+
+    def on_export_error(self, export_error):
+        self.export_status.config(text=f"Export failed: {export_error}")
 
     # Need this button to raise the export_to_html call when clicked
     def setup_export_button(self):
         export_button = tk.Button(self.root, text="Export to HTML", command=self.export_to_html)
         export_button.pack()
+        self.export_status = tk.Label(self.root, text='')
+        self.export_status.pack()
+        self.background_export = BackgroundExport(self.root, self.on_export_progress, self.on_export_done,
+                                                  self.on_export_error)
+
+    # Keep the board in a session: every change is appended to its journal as it happens, and the
+    # journal is folded into a fresh snapshot when the window is closed
+    def setup_session(self, session):
+        self.session = session
+        self.hexagon_drawer.journal = session
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
 
+    # Show frame times and the canvas item count in a corner of the board (needs an instrumentation)
+    def setup_overlay(self):
+        self.instrumentation.show_overlay(self.hexagon_drawer)
 
+    def on_close(self):
+        self.session.save(self.hexagon_drawer.board)
+        self.session.close()
+        self.root.destroy()
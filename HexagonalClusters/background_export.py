@@ -0,0 +1,89 @@
+# Runs exports on a worker thread, so the GUI keeps responding (and dragging keeps working) while
+# files are written. Progress and completion are handed back to the Tk thread through a queue that
+# is polled with after(); starting a new export supersedes (cancels) the one still running. Exports
+# write to the same files, so they run one after the other: a new export waits until the one it
+# cancelled has stopped (and with it any worker processes it started)
+import queue
+import threading
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class BackgroundExport:
+    poll_interval = 50  # milliseconds between two looks at the worker's messages
+
+    # on_progress(done, total), on_done(paths) and on_error(error) are called on the Tk thread
+    def __init__(self, widget, on_progress=None, on_done=None, on_error=None):
+        self.widget = widget
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.messages = queue.Queue()  # (export number, kind, payload) from the worker threads
+        self.export_number = 0  # number of the latest export; messages of older ones are dropped
+        self.cancel_event = None
+        self.worker = None  # thread of the latest export
+        self.poll_call = None  # pending after call of poll
+
+    @property
+    def running(self):
+        return self.cancel_event is not None
+
+    # Run job(progress) on a worker thread, cancelling the export still running (if any)
+    def start(self, job):
+        self.cancel()
+        self.export_number += 1
+        export_number = self.export_number
+        cancel_event = self.cancel_event = threading.Event()
+        previous = self.worker
+
+        def progress(done, total):
+            if cancel_event.is_set():
+                raise ExportCancelled()
+            self.messages.put((export_number, 'progress', (done, total)))
+
+        def run():
+            if previous is not None:
+                previous.join()
+            try:
+                if cancel_event.is_set():  # superseded while waiting
+                    raise ExportCancelled()
+                self.messages.put((export_number, 'done', job(progress)))
+            except ExportCancelled:
+                self.messages.put((export_number, 'cancelled', None))
+            except Exception as export_error:
+                self.messages.put((export_number, 'error', export_error))
+
+        self.worker = threading.Thread(target=run, name=f"export-{export_number}", daemon=True)
+        self.worker.start()
+        if self.poll_call is None:
+            self.poll_call = self.widget.after(self.poll_interval, self.poll)
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_event = None
+
+    # Hand the latest export's messages to the callbacks; keep polling while it runs
+    def poll(self):
+        self.poll_call = None
+        while True:
+            try:
+                export_number, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if export_number != self.export_number:
+                continue
+            if kind == 'progress':
+                if self.on_progress is not None:
+                    self.on_progress(*payload)
+                continue
+            self.cancel_event = None
+            if kind == 'done' and self.on_done is not None:
+                self.on_done(payload)
+            elif kind == 'error' and self.on_error is not None:
+                self.on_error(payload)
+
+        if self.running:
+            self.poll_call = self.widget.after(self.poll_interval, self.poll)
@@ -0,0 +1,79 @@
+# Batch mode: lay out and dock the boards of many input files without a display server,
+# spreading the files over a pool of worker processes
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from affinity import affinity_layout
+from board import Board, grid_layout, lattice_layout
+from elicited_information import load_elicited_information
+from exporter import ExportStyle, export_files
+from text_metrics import approximate_text_measurer
+from tiles import export_tiles
+
+
+# Lay elicited information texts out on the initial grid (or, with affinity, in pre-docked clusters
+# of similar texts) and dock whatever ends up close enough (with lattice, snap every hexagon to a cell)
+def layout_board(texts, width, affinity=False, lattice=False):
+    board = Board(lattice=lattice)
+    if affinity:
+        board.add_many(affinity_layout(texts, width, board.size))
+    elif lattice:
+        board.add_many(lattice_layout(texts, width, board.size))
+    else:
+        board.add_many(grid_layout(texts, width))
+    board.dock_all()
+    return board
+
+
+# Write a board's hexagons (number, center and text) and its clusters to a json file
+def export_layout(board, json_path, source=''):
+    layout = {
+        'source': source,
+        'size': board.size,
+        'hexagons': [{'number': record.number, 'x': record.x, 'y': record.y, 'text': record.text}
+                     for record in board],
+        'clusters': board.cluster_list()
+    }
+    with open(json_path, 'w') as json_file:
+        json.dump(layout, json_file, indent=1)
+
+
+# Process one input file into output_dir: the layout as json, plus SVG and HTML exports (and a PNG
+# with png=True), or with tiles=True a tile pyramid and its HTML viewer instead; returns the paths
+# written. Tiles are rendered in the calling process, since the files already keep every core busy
+def process_file(csv_path, output_dir, width, height=600, png=False, affinity=False, tiles=False, lattice=False):
+    board = layout_board(load_elicited_information(csv_path).information, width, affinity, lattice)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    json_path = os.path.join(output_dir, f"{name}_layout.json")
+    export_layout(board, json_path, source=csv_path)
+
+    style = ExportStyle(board.size)
+    measurer = approximate_text_measurer(style.font, style.font_size)
+    if tiles:
+        return [json_path] + export_tiles(board.snapshot(), style, measurer, os.path.join(output_dir, f"{name}_tiles"),
+                                          os.path.join(output_dir, f"{name}_tiles.html"), width, height, workers=1)
+    written = export_files(board.snapshot(), style, measurer,
+                           os.path.join(output_dir, f"{name}.svg"), os.path.join(output_dir, f"{name}.html"),
+                           width, height, os.path.join(output_dir, f"{name}.png") if png else None)
+    return [json_path] + written
+
+
+# Process all input files, one per worker process (workers defaults to the number of cores).
+# A file that fails is reported and skipped; returns the paths written for the others
+def run_batch(csv_paths, output_dir, width=900, height=600, workers=None, png=False, affinity=False, tiles=False,
+              lattice=False):
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, csv_path, output_dir, width, height, png, affinity, tiles, lattice):
+                   csv_path for csv_path in csv_paths}
+        for future in as_completed(futures):
+            try:
+                paths = future.result()
+            except Exception as batch_error:
+                print(f"Batch failed for {futures[future]}: {batch_error}")
+                continue
+            print(f"{futures[future]} -> {', '.join(paths)}")
+            written.extend(paths)
+    return written
@@ -0,0 +1,413 @@
+# Benchmarks of the interactive paths (drawing, text wrapping, dragging with docking) and of the
+# export, at board sizes from a hundred to tens of thousands of hexagons. Hexagon draws onto a
+# FakeCanvas, an in-memory stand-in for the tk.Canvas methods it uses, so no display is needed;
+# text is measured by average glyph width, as in batch mode. Results (throughput, drag frame latency
+# percentiles and peak memory) are printed and saved as json, to compare across commits:
+#
+#   python benchmark.py --sizes 100 1000 10000 50000 --output benchmark.json --compare baseline.json
+import argparse
+import functools
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import text_metrics
+from board import grid_layout
+from elicited_information import ElicitedInformation
+from hexagon import Hexagon
+from lattice import axial_to_pixel, spiral
+
+default_sizes = (100, 1000, 10000, 50000)
+drag_frames = 300  # frames per drag benchmark
+motion_events_per_frame = 3  # pointer motion events between two drag frames
+
+words = ('need', 'challenge', 'desire', 'idea', 'user', 'customer', 'support', 'faster', 'onboarding', 'report',
+         'export', 'dashboard', 'team', 'notification', 'integration', 'mobile', 'offline', 'search', 'data',
+         'privacy', 'billing', 'workflow', 'approval', 'calendar', 'reminder', 'visibility', 'collaboration',
+         'a', 'the', 'to', 'and', 'of', 'with', 'for', 'without', 'more', 'less', 'easier', 'automatic')
+
+
+# Synthetic elicited information: texts of 1 to 40 words, so that some fit a hexagon as they are,
+# some wrap and some are truncated
+def synthetic_information(count, seed=0):
+    random_words = random.Random(seed)
+    return [ElicitedInformation(' '.join(random_words.choices(words, k=random_words.randint(1, 40))),
+                                f"interview {index % 25}") for index in range(count)]
+
+
+# Stand-in for tk.Canvas that keeps items, tags and pending after() calls in memory
+class FakeCanvas:
+    def __init__(self, width=900, height=600):
+        self.items = {}  # item id -> [coordinates, options, tags]
+        self.tagged = {}  # tag -> set of item ids
+        self.next_id = 1
+        self.pending = {}  # after id -> (callback, arguments), in order of scheduling
+        self.next_after = 1
+        self.options = {'width': width, 'height': height, 'scrollregion': ''}
+        self.current = ()  # ids find_withtag('current') returns: the item "under the pointer"
+        self.view = [0.0, 0.0]  # canvas coordinates of the window's top left corner
+
+    def create(self, coordinates, options):
+        item_id = self.next_id
+        self.next_id += 1
+        tags = options.pop('tags', ())
+        tags = [tags] if isinstance(tags, str) else list(tags)
+        self.items[item_id] = [list(coordinates), options, tags]
+        for tag in tags:
+            self.tagged.setdefault(tag, set()).add(item_id)
+        return item_id
+
+    def create_polygon(self, *points, **options):
+        return self.create(flatten(points), options)
+
+    def create_text(self, x, y, **options):
+        return self.create((x, y), options)
+
+    def ids(self, tag):
+        if isinstance(tag, int):
+            return (tag,) if tag in self.items else ()
+        if tag == 'all':
+            return tuple(self.items)
+        if tag == 'current':
+            return self.current
+        return tuple(self.tagged.get(tag, ()))
+
+    def find_withtag(self, tag):
+        return self.ids(tag)
+
+    def find_closest(self, x, y):
+        return self.current
+
+    def coords(self, tag, *coordinates):
+        ids = self.ids(tag)
+        if not coordinates:
+            return list(self.items[ids[0]][0]) if ids else []
+        self.items[ids[0]][0] = flatten(coordinates)
+
+    def move(self, tag, dx, dy):
+        for item_id in self.ids(tag):
+            coordinates = self.items[item_id][0]
+            for index in range(0, len(coordinates), 2):
+                coordinates[index] += dx
+                coordinates[index + 1] += dy
+
+    def itemconfig(self, tag, **options):
+        for item_id in self.ids(tag):
+            self.items[item_id][1].update(options)
+
+    def itemcget(self, tag, option):
+        return self.items[self.ids(tag)[0]][1].get(option, '')
+
+    def addtag_withtag(self, new_tag, tag):
+        for item_id in self.ids(tag):
+            if new_tag not in self.items[item_id][2]:
+                self.items[item_id][2].append(new_tag)
+                self.tagged.setdefault(new_tag, set()).add(item_id)
+
+    def dtag(self, tag, tag_to_delete=None):
+        tag_to_delete = tag if tag_to_delete is None else tag_to_delete
+        for item_id in self.ids(tag):
+            if tag_to_delete in self.items[item_id][2]:
+                self.items[item_id][2].remove(tag_to_delete)
+                self.tagged[tag_to_delete].discard(item_id)
+
+    def delete(self, *tags):
+        for tag in tags:
+            for item_id in self.ids(tag):
+                for item_tag in self.items.pop(item_id)[2]:
+                    self.tagged[item_tag].discard(item_id)
+
+    def tag_bind(self, tag, sequence, function=None, add=None):
+        pass
+
+    def bind(self, sequence, function=None, add=None):
+        pass
+
+    def tag_raise(self, tag, above=None):
+        pass
+
+    def after(self, milliseconds, callback, *arguments):
+        after_id = self.next_after
+        self.next_after += 1
+        self.pending[after_id] = (callback, arguments)
+        return after_id
+
+    def after_idle(self, callback, *arguments):
+        return self.after(0, callback, *arguments)
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    # Run the pending after() calls (and whatever they schedule in turn), as the Tk event loop would
+    def run_pending(self):
+        while self.pending:
+            after_id = next(iter(self.pending))
+            callback, arguments = self.pending.pop(after_id)
+            callback(*arguments)
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def cget(self, option):
+        value = self.options[option]
+        return ' '.join(str(number) for number in value) if option == 'scrollregion' else value
+
+    def winfo_width(self):
+        return self.options['width']
+
+    def winfo_height(self):
+        return self.options['height']
+
+    def canvasx(self, x):
+        return self.view[0] + x
+
+    def canvasy(self, y):
+        return self.view[1] + y
+
+    def xview_moveto(self, fraction):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def __len__(self):
+        return len(self.items)
+
+
+def flatten(coordinates):
+    if len(coordinates) == 1 and isinstance(coordinates[0], (list, tuple)):
+        coordinates = coordinates[0]
+    return list(coordinates)
+
+
+# Mouse event stand-in, with the fields Hexagon reads
+class FakeEvent:
+    def __init__(self, widget, x, y, state=0):
+        self.widget = widget
+        self.x = x
+        self.y = y
+        self.state = state
+
+
+# A Hexagon drawing onto a FakeCanvas. Hexagon measures text with the shared measurer of its font;
+# seeding that with the approximate (headless) measurer keeps Tk out of the benchmarks
+def fake_hexagon(width=900, height=600):
+    text_metrics.measurers.setdefault(('Arial', 10), text_metrics.approximate_text_measurer('Arial', 10))
+    canvas = FakeCanvas(width, height)
+    return canvas, Hexagon(canvas)
+
+
+# The benchmarks: each one sets up a board of size hexagons for the given texts and returns the
+# operation to time, which returns (operations done, per-frame latencies or None)
+
+# Hexagon.draw, one hexagon at a time, then the viewport pass that realizes those in view
+def draw_benchmark(texts, width=900):
+    canvas, hexagon = fake_hexagon(width)
+
+    def run():
+        for x, y, text in grid_layout(texts, width):
+            hexagon.draw(x, y, text)
+        canvas.run_pending()
+        return len(texts), None
+    return run
+
+
+# Hexagon.draw_many, as used to load a whole file
+def draw_many_benchmark(texts, width=900):
+    canvas, hexagon = fake_hexagon(width)
+
+    def run():
+        hexagon.draw_many(grid_layout(texts, width))
+        canvas.run_pending()
+        return len(texts), None
+    return run
+
+
+# text_exceeds_width and wrap_text over every text, starting from empty caches
+def wrap_benchmark(texts):
+    canvas, hexagon = fake_hexagon()
+    hexagon.text_measurer.word_widths.clear()
+    hexagon.text_measurer.wrap.cache_clear()
+
+    def run():
+        for text in texts:
+            if hexagon.text_exceeds_width(text, hexagon.text_wrap_width):
+                hexagon.wrap_text(text, hexagon.text_wrap_width)
+        return len(texts), None
+    return run
+
+
+# Drag a hexagon with auto-snapping along the edge of a fully docked board, frame by frame: each
+# frame is a few motion events and the frame callback, which moves the hexagon and runs
+# check_for_docking (with lattice, snapping to lattice cells). Returns the latency of every frame
+def drag_benchmark(texts, lattice=False):
+    canvas, hexagon = fake_hexagon()
+    hexagon.board.use_lattice(lattice)
+    center = axial_to_pixel(0, 0, hexagon.size)
+    hexagon.draw_many((450 + x - center[0], 300 + y - center[1], text)
+                      for (x, y), text in zip((axial_to_pixel(q, r, hexagon.size) for q, r in spiral(len(texts))),
+                                              texts))
+    canvas.run_pending()
+    dragged = hexagon.hexagons[len(texts)]  # on the outermost ring
+    if not dragged.realized:  # outside the viewport on large boards
+        hexagon.realize(dragged)
+    canvas.current = (dragged.hexagon,)
+
+    def run():
+        latencies = []
+        hexagon.on_drag_start(FakeEvent(canvas, 0, 0))
+        pointer = itertools.count()
+        for _ in range(drag_frames):
+            start = time.perf_counter()
+            for _ in range(motion_events_per_frame):
+                step = next(pointer)
+                angle = step / 20
+                hexagon.on_drag_motion(FakeEvent(canvas, round(30 * math.cos(angle)), round(30 * math.sin(angle)),
+                                                 0x1))
+            canvas.run_pending()
+            latencies.append(time.perf_counter() - start)
+        hexagon.on_drag_end(FakeEvent(canvas, 0, 0))
+        canvas.run_pending()
+        return drag_frames, latencies
+    return run
+
+
+# export_to_html of the whole board (SVG and HTML; no PNG, which is bounded by Pillow's rasterizer).
+# The files go to a temporary directory that run_benchmark removes through run.cleanup
+def export_benchmark(texts, width=900):
+    canvas, hexagon = fake_hexagon(width)
+    hexagon.draw_many(grid_layout(texts, width))
+    canvas.run_pending()
+    output_dir = tempfile.TemporaryDirectory(prefix='hexagon_benchmark_')
+    hexagon.output_dir = output_dir.name + os.sep
+    hexagon.export_png = False
+
+    def run():
+        hexagon.export_to_html(width, 600)
+        return len(texts), None
+    run.cleanup = output_dir.cleanup
+    return run
+
+
+benchmarks = {
+    'draw': (draw_benchmark, 'hexagons/s'),
+    'draw_many': (draw_many_benchmark, 'hexagons/s'),
+    'wrap_text': (wrap_benchmark, 'texts/s'),
+    'drag_frame': (drag_benchmark, 'frames/s'),
+    'drag_frame_lattice': (functools.partial(drag_benchmark, lattice=True), 'frames/s'),
+    'export_to_html': (export_benchmark, 'hexagons/s'),
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+# Run one benchmark at one board size. Timing and memory are measured in separate runs (each on
+# a fresh board), since tracing allocations slows everything down
+def run_benchmark(name, size, memory=True):
+    setup, unit = benchmarks[name]
+    texts = [information.information for information in synthetic_information(size)]
+
+    run = setup(texts)
+    gc.collect()
+    start = time.perf_counter()
+    try:
+        done, latencies = run()
+        seconds = time.perf_counter() - start
+    finally:
+        cleanup(run)
+    result = {'benchmark': name, 'hexagons': size, 'seconds': seconds, 'throughput': done / seconds, 'unit': unit}
+    if latencies:
+        result['frame_latency_ms'] = {f"p{round(100 * fraction)}": 1000 * percentile(latencies, fraction)
+                                      for fraction in (0.5, 0.9, 0.95, 0.99)}
+        result['frame_latency_ms']['max'] = 1000 * max(latencies)
+
+    if memory:
+        run = setup(texts)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+            cleanup(run)
+    return result
+
+
+# Remove whatever a benchmark's setup left on disk, if anything
+def cleanup(run):
+    if hasattr(run, 'cleanup'):
+        run.cleanup()
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def describe(result):
+    line = f"{result['benchmark']:>15} {result['hexagons']:>7} hexagons: " \
+           f"{result['throughput']:>12,.0f} {result['unit']}"
+    if 'frame_latency_ms' in result:
+        latency = result['frame_latency_ms']
+        line += f", frame p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms"
+    if 'peak_memory_mb' in result:
+        line += f", peak {result['peak_memory_mb']:.1f} MB"
+    return line
+
+
+# Print how each result compares to the same benchmark and size in an earlier results file
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    earlier = {(result['benchmark'], result['hexagons']): result for result in baseline['results']}
+    print(f"Compared to {baseline_path} (commit {baseline.get('commit')}):")
+    for result in results:
+        before = earlier.get((result['benchmark'], result['hexagons']))
+        if before is None:
+            continue
+        line = f"{result['benchmark']:>15} {result['hexagons']:>7} hexagons: throughput " \
+               f"{100 * (result['throughput'] / before['throughput'] - 1):+.1f}%"
+        if 'frame_latency_ms' in result and 'frame_latency_ms' in before:
+            p95 = result['frame_latency_ms']['p95'] / before['frame_latency_ms']['p95']
+            line += f", frame p95 {100 * (p95 - 1):+.1f}%"
+        if 'peak_memory_mb' in result and 'peak_memory_mb' in before:
+            line += f", peak memory {100 * (result['peak_memory_mb'] / before['peak_memory_mb'] - 1):+.1f}%"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark drawing, text wrapping, docking and export")
+    parser.add_argument('--sizes', nargs='+', type=int, default=default_sizes, help="board sizes, in hexagons")
+    parser.add_argument('--benchmarks', nargs='+', choices=sorted(benchmarks), default=list(benchmarks))
+    parser.add_argument('--no-memory', action='store_true', help="skip the (slower) peak memory runs")
+    parser.add_argument('--output', default='benchmark.json', help="json file to save the results to")
+    parser.add_argument('--compare', metavar='JSON', help="results of an earlier run to compare with")
+    arguments = parser.parse_args()
+
+    results = []
+    for size in arguments.sizes:
+        for name in arguments.benchmarks:
+            results.append(run_benchmark(name, size, not arguments.no_memory))
+            print(describe(results[-1]))
+
+    with open(arguments.output, 'w', encoding='utf-8') as output_file:
+        json.dump({'commit': current_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'results': results}, output_file, indent=1)
+    print(f"Results saved to {arguments.output}")
+    if arguments.compare:
+        compare(results, arguments.compare)
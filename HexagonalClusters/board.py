@@ -0,0 +1,293 @@
+# Headless board model: the hexagons (number, center, text), their spatial index and docking.
+# Nothing here needs Tk; the Hexagon class renders a Board onto a canvas, and the batch mode
+# lays out and docks boards without a display
+import math
+from collections import namedtuple
+
+from spatial_index import SpatialIndex
+from docking import best_docking, hexagon_vertices
+from registry import HexagonRecord, HexagonRegistry
+from clusters import ClusterTracker
+from lattice import axial_round, axial_to_pixel, pixel_to_axial, ring
+
+
+# Immutable copy of a hexagon, safe to hand to another thread or process
+# (cluster is the id of the cluster the hexagon belongs to)
+HexagonSnapshot = namedtuple('HexagonSnapshot', ['number', 'x', 'y', 'text', 'cluster'])
+
+
+class Board:
+    lattice_search_radius = 2  # rings of cells around the nearest one searched for a free cell
+
+    def __init__(self, size=55, snap_distance=5, docking_tolerance=0.5, lattice=False):
+        self.size = size  # hexagon radius (center to vertex), in board pixels
+        self.snap_distance = snap_distance  # to automatically snap a moving hexagon to a nearby one
+        self.docking_tolerance = docking_tolerance  # pixels of float drift allowed when testing sides for coincidence
+        self.hexagons = HexagonRegistry()  # hexagon records, by number
+        self.hexagon_id = 0  # last hexagon number handed out on this board
+        self.bounds = None  # [min_x, min_y, max_x, max_y] of all hexagon centers
+
+        # Two hexagons can only dock if their centers are at most two radii plus the snapping
+        # distance apart, so the spatial index buckets are sized to that reach and a docking
+        # query only ever visits the 3x3 buckets around the dragged hexagon
+        self.docking_reach = 2 * self.size + self.snap_distance
+        self.spatial_index = SpatialIndex(self.docking_reach)
+
+        # Docked hexagons sit exactly one apothem pair apart, in one of the six directions their
+        # sides face (0, 60, ..., 300 degrees for pointy-top hexagons). Adjacency is re-checked for
+        # every hexagon that moves, and the cluster tracker follows it incrementally
+        self.adjacent_offsets = [(math.sqrt(3) * self.size * math.cos(math.radians(60 * i)),
+                                  math.sqrt(3) * self.size * math.sin(math.radians(60 * i))) for i in range(6)]
+        self.clusters = ClusterTracker()
+        self.docking_candidates = 0  # running total of hexagons find_docking has examined
+
+        # Lattice mode: docking moves a hexagon exactly onto the nearest free cell of the axial lattice
+        # (see lattice.py) instead of matching sides pairwise. Which hexagons sit on which cell is kept
+        # in a hash map, so finding a free cell takes the same few lookups on any board. A hexagon
+        # occupies the cell its center is in, even if it is not centered on it (e.g. from a session
+        # laid out without the lattice)
+        self.cells = None  # in lattice mode: (q, r) -> set of numbers of the hexagons in that cell
+        self.hexagon_cells = {}  # in lattice mode: hexagon number -> (q, r) of the cell it is in
+        self.use_lattice(lattice)
+
+    # Add a hexagon under the next free number, or under the given one (e.g. when replaying a session)
+    def add(self, x, y, text, number=None):
+        if number is None:
+            number = self.hexagon_id + 1
+        self.hexagon_id = max(self.hexagon_id, number)
+        record = HexagonRecord(number, x, y, text)
+        self.hexagons.add(record)
+        self.spatial_index.insert(record.number, x, y)  # index the center for docking and viewport queries
+        self.extend_bounds(x, y)
+        self.clusters.add(record.number)
+        self.update_cell(record.number)
+        self.update_adjacency(record.number)
+        return record
+
+    # Add many hexagons from an iterable of (x, y, text)
+    def add_many(self, items):
+        return [self.add(x, y, text) for x, y, text in items]
+
+    def move(self, number, dx, dy):
+        record = self.place(number, dx, dy)
+        self.update_adjacency(number)
+        return record
+
+    # Move several hexagons (e.g., a whole cluster) by the same (dx, dy); adjacency is only
+    # re-checked once all of them are in their new place, so they stay docked to each other
+    def move_many(self, numbers, dx, dy):
+        for number in numbers:
+            self.place(number, dx, dy)
+        for number in numbers:
+            self.update_adjacency(number)
+
+    # Move hexagon number so that its center is exactly at (x, y)
+    def move_to(self, number, x, y):
+        record = self.hexagons[number]
+        record.x = x
+        record.y = y
+        self.spatial_index.move(number, x, y)
+        self.extend_bounds(x, y)
+        self.update_cell(number)
+        self.update_adjacency(number)
+        return record
+
+    def place(self, number, dx, dy):
+        record = self.hexagons[number]
+        record.x += dx
+        record.y += dy
+        self.spatial_index.move(number, record.x, record.y)
+        self.extend_bounds(record.x, record.y)
+        self.update_cell(number)
+        return record
+
+    # Numbers of the hexagons docked to hexagon number, from their current centers
+    def docked_neighbours(self, number):
+        x, y = self.spatial_index.centers[number]
+        tolerance = self.docking_tolerance
+        neighbours = set()
+        for other in self.spatial_index.nearby(x, y, math.sqrt(3) * self.size + tolerance):
+            other_x, other_y = self.spatial_index.centers[other]
+            for offset_x, offset_y in self.adjacent_offsets:
+                if abs(other_x - x - offset_x) <= tolerance and abs(other_y - y - offset_y) <= tolerance:
+                    neighbours.add(other)
+                    break
+        return neighbours
+
+    # Bring the adjacency graph (and so the clusters) in line with where hexagon number is now
+    def update_adjacency(self, number):
+        docked = self.docked_neighbours(number)
+        previous = self.clusters.neighbours[number]
+        self.clusters.disconnect(number, previous - docked)
+        for neighbour in docked - previous:
+            self.clusters.connect(number, neighbour)
+
+    # Clusters of docked hexagons (at least two each), as sorted lists of hexagon numbers
+    def cluster_list(self):
+        return self.clusters.clusters()
+
+    def extend_bounds(self, x, y):
+        if self.bounds is None:
+            self.bounds = [x, y, x, y]
+        else:
+            self.bounds[0] = min(self.bounds[0], x)
+            self.bounds[1] = min(self.bounds[1], y)
+            self.bounds[2] = max(self.bounds[2], x)
+            self.bounds[3] = max(self.bounds[3], y)
+
+    # Numbers of the hexagons whose centers lie inside the given rectangle
+    def within(self, min_x, min_y, max_x, max_y):
+        return self.spatial_index.within(min_x, min_y, max_x, max_y)
+
+    @property
+    def lattice(self):
+        return self.cells is not None
+
+    # Switch lattice mode on (indexing which hexagons already sit on a cell) or off
+    def use_lattice(self, enabled=True):
+        self.cells = {} if enabled else None
+        self.hexagon_cells = {}
+        if enabled:
+            for number in self.hexagons.records:
+                self.update_cell(number)
+
+    # Lattice mode: record which cell hexagon number's center is in
+    def update_cell(self, number):
+        if self.cells is None:
+            return
+        cell = axial_round(*pixel_to_axial(*self.spatial_index.centers[number], self.size))
+        previous = self.hexagon_cells.get(number)
+        if cell == previous:
+            return
+        if previous is not None:
+            occupants = self.cells[previous]
+            occupants.discard(number)
+            if not occupants:
+                del self.cells[previous]
+        self.cells.setdefault(cell, set()).add(number)
+        self.hexagon_cells[number] = cell
+
+    # Lattice mode: the move that centers hexagon number exactly on the nearest cell that no other
+    # hexagon occupies: the cell its center is in, or else the closest free one in the rings around
+    # it. Returns None if the hexagon is already there, or no cell within reach is free
+    def find_lattice_cell(self, number):
+        x, y = self.spatial_index.centers[number]
+        q, r = axial_round(*pixel_to_axial(x, y, self.size))
+        # Hexagons off the lattice (e.g. from a session laid out without it) can overlap a cell whose
+        # center is not inside them, so a cell is only free if no other center is closer than docked
+        clearance = math.sqrt(3) * self.size - self.docking_tolerance
+        for radius in range(self.lattice_search_radius + 1):
+            free = []
+            for cell in ring(q, r, radius):
+                occupants = self.cells.get(cell)
+                if occupants and occupants != {number}:
+                    self.docking_candidates += len(occupants)
+                    continue
+                cell_x, cell_y = axial_to_pixel(*cell, self.size)
+                nearby = self.spatial_index.nearby(cell_x, cell_y, clearance)
+                self.docking_candidates += len(nearby)
+                if any(other != number for other in nearby):
+                    continue
+                free.append(((cell_x - x) ** 2 + (cell_y - y) ** 2, cell_x - x, cell_y - y))
+            if free:
+                _, dx, dy = min(free)
+                return (dx, dy) if dx or dy else None
+        return None
+
+    # The lattice translation nearest to (dx, dy), e.g. to move a whole cluster without leaving the lattice
+    def lattice_translation(self, dx, dy):
+        return axial_to_pixel(*axial_round(*pixel_to_axial(dx, dy, self.size)), self.size)
+
+    # Find how to move hexagon number so that it docks onto its nearest neighbour (in lattice mode:
+    # onto the nearest free lattice cell). Returns the (dx, dy) move, or None if there is none
+    def find_docking(self, number):
+        if self.cells is not None:
+            return self.find_lattice_cell(number)
+
+        # Only hexagons whose centers are within docking reach can dock with this one,
+        # so ask the spatial index for those instead of walking the whole board
+        center = self.spatial_index.centers[number]
+        candidates = [hexagon for hexagon in self.spatial_index.nearby(*center, self.docking_reach)
+                      if hexagon != number]  # skip the hexagon itself
+        self.docking_candidates += len(candidates)
+        if not candidates:
+            return None
+
+        # Compare all sides of the hexagon against all sides of every candidate in one batched pass;
+        # the kernel returns the closest facing side pair that is within the snapping distance or
+        # already coincident, in which case we just dock them at midpoint
+        docking = best_docking(
+            hexagon_vertices([center], self.size)[0],
+            hexagon_vertices([self.spatial_index.centers[hexagon] for hexagon in candidates], self.size),
+            self.snap_distance, self.docking_tolerance
+        )
+        if docking is None:
+            return None
+        return docking[3], docking[4]
+
+    # Dock hexagon number onto its nearest neighbour, if any; returns whether it moved
+    def dock(self, number):
+        move = self.find_docking(number)
+        if move is None:
+            return False
+        self.move(number, *move)
+        return True
+
+    # Dock every hexagon in turn, in drawing order; returns how many hexagons moved
+    def dock_all(self):
+        return sum(self.dock(record.number) for record in list(self.hexagons))
+
+    # Fill an empty board from saved hexagons, as (number, x, y, text, cluster) like HexagonSnapshot,
+    # and the saved pairs of docked hexagon numbers. Adjacency and clusters were known when they were
+    # saved, so they are taken as they are instead of being checked again
+    def restore(self, hexagons, docked_pairs):
+        hexagons = list(hexagons)
+        for number, x, y, text, _ in hexagons:
+            self.hexagons.add(HexagonRecord(number, x, y, text))
+        self.spatial_index.insert_many((number, x, y) for number, x, y, _, _ in hexagons)
+        self.clusters.restore(((number, cluster) for number, _, _, _, cluster in hexagons), docked_pairs)
+        if hexagons:
+            self.hexagon_id = max(self.hexagon_id, max(hexagon[0] for hexagon in hexagons))
+            xs = [hexagon[1] for hexagon in hexagons]
+            ys = [hexagon[2] for hexagon in hexagons]
+            self.extend_bounds(min(xs), min(ys))
+            self.extend_bounds(max(xs), max(ys))
+        if self.cells is not None:
+            for number, _, _, _, _ in hexagons:
+                self.update_cell(number)
+
+    # Pairs of docked hexagon numbers (the smaller number first), e.g. to save them with the board
+    def docked_pairs(self):
+        return [(number, neighbour) for number, neighbours in self.clusters.neighbours.items()
+                for neighbour in neighbours if number < neighbour]
+
+    # Immutable copies of all hexagons, in drawing order
+    def snapshot(self):
+        return tuple(HexagonSnapshot(record.number, record.x, record.y, record.text, self.clusters.find(record.number))
+                     for record in self.hexagons)
+
+    def __iter__(self):
+        return iter(self.hexagons)
+
+    def __len__(self):
+        return len(self.hexagons)
+
+
+# Initial layout: lay texts out row by row on a grid that fits the given width,
+# starting at (margin, margin). Yields (x, y, text) ready for Board.add_many.
+# With start, the texts continue the grid from that position (e.g., the next chunk of a file)
+def grid_layout(texts, width, spacing=100, margin=100, start=0):
+    columns = max(1, (width - 2 * margin) // spacing + 1)
+    for index, text in enumerate(texts, start):
+        row, column = divmod(index, columns)
+        yield margin + column * spacing, margin + row * spacing, text
+
+
+# Initial layout for lattice mode: like grid_layout, but with every hexagon centered on a cell of
+# the lattice, leaving a free cell between neighbours so that none of them start out docked
+def lattice_layout(texts, width, size, margin=100, start=0):
+    columns = max(1, int((width - 2 * margin) // (2 * math.sqrt(3) * size)) + 1)
+    first_q, first_r = axial_round(*pixel_to_axial(margin, margin, size))
+    for index, text in enumerate(texts, start):
+        row, column = divmod(index, columns)
+        yield (*axial_to_pixel(first_q + 2 * column - row, first_r + 2 * row, size), text)
@@ -0,0 +1,108 @@
+# Incremental cluster tracking: which hexagons are docked to which (the adjacency graph), and
+# which cluster each hexagon belongs to, kept up to date as hexagons snap together or separate.
+# Every hexagon is labelled with the id of its cluster. Joining two clusters relabels the smaller
+# one; a separation searches outwards from both sides of every broken link at once, and stops as
+# soon as the searches meet, so only a part that really broke off (and only the smaller side of
+# it) is ever walked and relabelled, however large the cluster
+from collections import deque
+
+
+class ClusterTracker:
+    def __init__(self):
+        self.neighbours = {}  # hexagon number -> set of the numbers it is docked to
+        self.cluster = {}  # hexagon number -> id of the cluster it belongs to
+        self.members = {}  # cluster id -> set of hexagon numbers in that cluster
+        self.last_id = 0  # last cluster id handed out
+
+    def add(self, number):
+        self.neighbours[number] = set()
+        self.last_id += 1
+        self.cluster[number] = self.last_id
+        self.members[self.last_id] = {number}
+
+    # Id of the cluster number belongs to
+    def find(self, number):
+        return self.cluster[number]
+
+    # Record that two hexagons docked, joining their clusters (the smaller one into the larger)
+    def connect(self, first, second):
+        self.neighbours[first].add(second)
+        self.neighbours[second].add(first)
+        first_id = self.cluster[first]
+        second_id = self.cluster[second]
+        if first_id == second_id:
+            return
+        if len(self.members[first_id]) < len(self.members[second_id]):
+            first_id, second_id = second_id, first_id
+        joined = self.members.pop(second_id)
+        for member in joined:
+            self.cluster[member] = first_id
+        self.members[first_id] |= joined
+
+    # Record that number separated from the given neighbours. Every part the cluster may have broken
+    # into holds number or one of them, so they are compared two at a time until one is left: of two
+    # in the same part, one is dropped; of two in different parts, the part that ran out first is split
+    # off under a fresh id (and all of them in it are dropped), while the other stays with the cluster
+    def disconnect(self, number, others):
+        for other in others:
+            self.neighbours[number].discard(other)
+            self.neighbours[other].discard(number)
+        ends = [number, *others]
+        while len(ends) > 1:
+            part = self.separated(ends[0], ends[1])
+            if part is None:
+                del ends[1]
+            else:
+                self.split(part)
+                ends = [end for end in ends if end not in part]
+
+    # Breadth-first searches from first and from second, taking turns one hexagon at a time. Returns
+    # None as soon as they meet (both are still in the same cluster), or else all the hexagons the
+    # search that ran out first has reached: the part that separated
+    def separated(self, first, second):
+        seen = ({first}, {second})
+        frontiers = (deque([first]), deque([second]))
+        side = 0
+        while frontiers[side]:
+            for neighbour in self.neighbours[frontiers[side].popleft()]:
+                if neighbour in seen[1 - side]:
+                    return None
+                if neighbour not in seen[side]:
+                    seen[side].add(neighbour)
+                    frontiers[side].append(neighbour)
+            side = 1 - side
+        return seen[side]
+
+    # Give a part of a cluster that separated from the rest its own cluster id
+    def split(self, part):
+        self.members[self.cluster[next(iter(part))]] -= part
+        self.last_id += 1
+        for member in part:
+            self.cluster[member] = self.last_id
+        self.members[self.last_id] = part
+
+    # Fill an empty tracker in one go from saved (number, cluster id) pairs and pairs of docked
+    # numbers, e.g. when loading a board, instead of joining the clusters edge by edge
+    def restore(self, clusters, docked_pairs):
+        neighbours = self.neighbours
+        members = self.members
+        for number, cluster_id in clusters:
+            neighbours[number] = set()
+            self.cluster[number] = cluster_id
+            if cluster_id in members:
+                members[cluster_id].add(number)
+            else:
+                members[cluster_id] = {number}
+        if members:
+            self.last_id = max(self.last_id, max(members))
+        for first, second in docked_pairs:
+            neighbours[first].add(second)
+            neighbours[second].add(first)
+
+    # Set of hexagon numbers in number's cluster (including number itself)
+    def cluster_of(self, number):
+        return self.members[self.find(number)]
+
+    # Clusters with at least min_size hexagons, each as a sorted list of hexagon numbers
+    def clusters(self, min_size=2):
+        return [sorted(members) for members in self.members.values() if len(members) >= min_size]
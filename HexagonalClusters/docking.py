@@ -0,0 +1,74 @@
+# Closed-form docking kernel: compares every side of the dragged hexagon against every side of
+# N candidate hexagons in one batched NumPy pass, instead of building shapely geometries per side pair
+import math
+import numpy as np
+
+# Vertex offsets of a hexagon of radius 1 centered at the origin, in the same order Hexagon.draw
+# emits them (pointy-top, first vertex at 30 degrees)
+UNIT_HEXAGON_VERTICES = tuple(
+    (math.cos(math.radians(60 * i + 30)), math.sin(math.radians(60 * i + 30))) for i in range(6)
+)
+_unit_hexagon = np.array(UNIT_HEXAGON_VERTICES)
+
+
+# Given an (N, 2) array of centers, return the (N, 6, 2) array of hexagon vertices of the given radius
+def hexagon_vertices(centers, size):
+    return np.asarray(centers, dtype=float)[:, None, :] + size * _unit_hexagon[None, :, :]
+
+
+# Find the best pair of sides along which the dragged hexagon can dock onto one of the candidates.
+# dragged_vertices is a (6, 2) array and candidate_vertices an (N, 6, 2) array. Two sides qualify if
+# they face each other (opposite directions, as adjacent sides of equally wound polygons do) and either
+# their midpoints are closer than snap_distance, or they are collinear within tolerance pixels and their
+# extents overlap. Among all qualifying pairs the one with the closest midpoints wins.
+# Returns (candidate_index, dragged_side_index, candidate_side_index, dx, dy) or None if nothing docks,
+# where (dx, dy) moves the dragged side's midpoint onto the candidate side's midpoint.
+def best_docking(dragged_vertices, candidate_vertices, snap_distance, tolerance):
+    dragged_vertices = np.asarray(dragged_vertices, dtype=float)
+    candidate_vertices = np.asarray(candidate_vertices, dtype=float)
+    if candidate_vertices.shape[0] == 0:
+        return None
+
+    # Side i runs from vertex i to vertex i + 1 (wrapping around)
+    dragged_start = dragged_vertices  # (6, 2)
+    dragged_end = np.roll(dragged_vertices, -1, axis=0)
+    candidate_start = candidate_vertices  # (N, 6, 2)
+    candidate_end = np.roll(candidate_vertices, -1, axis=1)
+
+    # Broadcast everything to (N, 6 dragged sides, 6 candidate sides, 2)
+    a_start = dragged_start[None, :, None, :]
+    a_direction = (dragged_end - dragged_start)[None, :, None, :]
+    b_start = candidate_start[:, None, :, :]
+    b_end = candidate_end[:, None, :, :]
+
+    # Distances between side midpoints
+    offset = (b_start + b_end) / 2 - (a_start + a_direction / 2)
+    distance = np.hypot(offset[..., 0], offset[..., 1])
+
+    # Sides must face each other
+    b_direction = b_end - b_start
+    facing = (a_direction[..., 0] * b_direction[..., 0] + a_direction[..., 1] * b_direction[..., 1]) < 0
+
+    # Perpendicular distance of both candidate side endpoints from the dragged side's line
+    a_length_squared = a_direction[..., 0] ** 2 + a_direction[..., 1] ** 2
+    a_length = np.sqrt(a_length_squared)
+    to_start = b_start - a_start
+    to_end = b_end - a_start
+    start_offset = np.abs(a_direction[..., 0] * to_start[..., 1] - a_direction[..., 1] * to_start[..., 0]) / a_length
+    end_offset = np.abs(a_direction[..., 0] * to_end[..., 1] - a_direction[..., 1] * to_end[..., 0]) / a_length
+    collinear = (start_offset <= tolerance) & (end_offset <= tolerance)
+
+    # Overlap of the candidate side's projection onto the dragged side, as fractions of its length
+    start_t = (a_direction[..., 0] * to_start[..., 0] + a_direction[..., 1] * to_start[..., 1]) / a_length_squared
+    end_t = (a_direction[..., 0] * to_end[..., 0] + a_direction[..., 1] * to_end[..., 1]) / a_length_squared
+    overlap = (np.minimum(np.maximum(start_t, end_t), 1) - np.maximum(np.minimum(start_t, end_t), 0)) * a_length
+    coincident = collinear & (overlap > tolerance)
+
+    score = np.where(facing & ((distance < snap_distance) | coincident), distance, np.inf)
+    best = int(np.argmin(score))
+    if not np.isfinite(score.flat[best]):
+        return None
+
+    candidate_index, dragged_side_index, candidate_side_index = np.unravel_index(best, score.shape)
+    dx, dy = offset[candidate_index, dragged_side_index, candidate_side_index]
+    return int(candidate_index), int(dragged_side_index), int(candidate_side_index), float(dx), float(dy)
@@ -1,21 +1,82 @@
+# Elicited information records and the csv input they are read from
+import csv  # to read input files
+import sys
+from array import array
+
+chunk_size = 5000  # records per chunk when streaming a csv file
+
+
 # Class for elicited information (needs, challenges, desires, ideas, etc.)
 class ElicitedInformation:
+    __slots__ = ('information', 'source')
+
     def __init__(self, information, source=''):
-        self.__information = information  # the information text
-        self.__source = source  # the information source
+        self.information = information  # the information text
+        self.source = source  # the information source
+
+
+# Compact, column-wise store of many elicited information records: the texts in one list, and
+# the sources as indices into a table of distinct (interned) source names, since the same few
+# sources repeat over thousands of rows. Records are handed out as ElicitedInformation on demand
+class ElicitedInformationStore:
+    __slots__ = ('information', 'source_ids', 'source_names', 'source_index')
+
+    def __init__(self):
+        self.information = []  # information texts, in csv order
+        self.source_ids = array('I')  # per record, index into source_names
+        self.source_names = []  # distinct source names
+        self.source_index = {}  # source name -> index in source_names
+
+    def append(self, source, information):
+        source_id = self.source_index.get(source)
+        if source_id is None:
+            source_id = self.source_index[source] = len(self.source_names)
+            self.source_names.append(sys.intern(source))
+        self.source_ids.append(source_id)
+        self.information.append(information)
+
+    # Append a chunk of (source, information) pairs, as yielded by stream_elicited_information
+    def extend(self, chunk):
+        for source, information in chunk:
+            self.append(source, information)
+
+    def source(self, index):
+        return self.source_names[self.source_ids[index]]
+
+    def __getitem__(self, index):
+        return ElicitedInformation(self.information[index], self.source(index))
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def __len__(self):
+        return len(self.information)
 
-    @property
-    def information(self):
-        return self.__information
 
-    @information.setter
-    def information(self, information):
-        self.__information = information
+# Read a csv file with two columns (source and elicited information text) chunk by chunk, so that
+# callers can start using the first records before the whole file is read. Yields lists of
+# (source, information) pairs, with repeated source names interned
+def stream_elicited_information(csv_path, size=None):
+    size = size or chunk_size
+    with open(csv_path, 'r', newline='') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        chunk = []
+        for record in csv_reader:
+            if len(record) < 2:  # skip blank lines
+                continue
+            if record[0] == 'source' and csv_reader.line_num == 1:  # skip header line in csv
+                continue
+            chunk.append((sys.intern(record[0]), record[1]))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
-    @property
-    def source(self):
-        return self.__source
 
-    @source.setter
-    def source(self, source):
-        self.__source = source
+# Read all elicited information from a csv file into a store
+def load_elicited_information(csv_path):
+    store = ElicitedInformationStore()
+    for chunk in stream_elicited_information(csv_path):
+        store.extend(chunk)
+    return store
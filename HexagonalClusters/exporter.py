@@ -0,0 +1,184 @@
+# Direct SVG, HTML and PNG export of a board, drawn straight from the hexagon records in one
+# in-process pass (no PostScript, no ImageMagick subprocess, no temporary files)
+import html
+
+from docking import UNIT_HEXAGON_VERTICES
+
+progress_step = 500  # hexagons exported between two progress reports
+
+
+# How exported hexagons look; the defaults match what Hexagon draws on the canvas
+class ExportStyle:
+    def __init__(self, size=55, background_color='orange', outline_color='white', font='Arial', font_size=10,
+                 truncation_mark='[...]', number_color='navy', text_color='black'):
+        self.size = size
+        self.background_color = background_color
+        self.outline_color = outline_color
+        self.font = font
+        self.font_size = font_size
+        self.truncation_mark = truncation_mark
+        self.number_color = number_color
+        self.text_color = text_color
+        self.padding = size + 10  # room around the outermost hexagon centers
+        self.line_height = font_size * 96 / 72 * 1.2  # pixels per line of text
+
+    # The lines of text a hexagon shows, wrapped and truncated exactly as on the canvas
+    def text_lines(self, text, measurer):
+        text_wrap_width = self.size * 0.85
+        if measurer.width(text) / 2 > text_wrap_width:
+            text = measurer.wrap(text, 2 * text_wrap_width, self.size * 0.85, self.font_size, self.truncation_mark)
+        return text.rstrip('\n').split('\n')
+
+    # Vertices of a hexagon centered on (x, y), drawn scale times its size
+    def vertices(self, x, y, scale=1.0):
+        size = self.size * scale
+        return [(x + size * offset_x, y + size * offset_y) for offset_x, offset_y in UNIT_HEXAGON_VERTICES]
+
+
+# Bounding box (min_x, min_y, width, height) of the hexagons plus padding, in board coordinates
+def export_bounds(hexagons, style):
+    if not hexagons:
+        return 0, 0, 2 * style.padding, 2 * style.padding
+    min_x = min(hexagon.x for hexagon in hexagons) - style.padding
+    min_y = min(hexagon.y for hexagon in hexagons) - style.padding
+    max_x = max(hexagon.x for hexagon in hexagons) + style.padding
+    max_y = max(hexagon.y for hexagon in hexagons) + style.padding
+    return min_x, min_y, max_x - min_x, max_y - min_y
+
+
+# One hexagon as an SVG group: cell, number on the top vertex and (selectable) text in the middle.
+# The group records the cluster the hexagon belongs to, so docked hexagons can be told apart
+def hexagon_svg(hexagon, style, measurer):
+    points = ' '.join(f"{x:.2f},{y:.2f}" for x, y in style.vertices(hexagon.x, hexagon.y))
+    lines = style.text_lines(hexagon.text, measurer)
+    first_line_y = hexagon.y - (len(lines) - 1) * style.line_height / 2
+    tspans = ''.join(
+        f'<tspan x="{hexagon.x:.2f}" y="{first_line_y + index * style.line_height:.2f}">{html.escape(line)}</tspan>'
+        for index, line in enumerate(lines)
+    )
+    return (
+        f'<g class="hexagon" id="hexagon-{hexagon.number}" data-cluster="{hexagon.cluster}">'
+        f'<title>{html.escape(hexagon.text)}</title>'
+        f'<polygon points="{points}"/>'
+        f'<text class="number" x="{hexagon.x:.2f}" y="{hexagon.y - style.size + 7:.2f}">{hexagon.number}</text>'
+        f'<text class="information">{tspans}</text>'
+        f'</g>'
+    )
+
+
+# Call progress(done) every progress_step items while iterating over items (if there is a progress)
+def reporting(items, progress):
+    for done, item in enumerate(items):
+        if progress is not None and done % progress_step == 0:
+            progress(done)
+        yield item
+
+
+# A complete SVG document of the given hexagons (board snapshots: number, x, y, text and cluster).
+# progress, if given, is called with the number of hexagons done so far
+def svg_document(hexagons, style, measurer, progress=None):
+    hexagons = list(hexagons)
+    min_x, min_y, width, height = export_bounds(hexagons, style)
+    font = html.escape(style.font)
+    return '\n'.join([
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="{min_x:.2f} {min_y:.2f} {width:.2f} {height:.2f}">',
+        '<style>',
+        f'.hexagon polygon {{ fill: {style.background_color}; stroke: {style.outline_color}; stroke-width: 0.5; }}',
+        f'.hexagon text {{ font-family: {font}; text-anchor: middle; dominant-baseline: middle; }}',
+        f'.hexagon .number {{ font-size: {style.font_size + 2}pt; fill: {style.number_color}; }}',
+        f'.hexagon .information {{ font-size: {style.font_size}pt; fill: {style.text_color}; }}',
+        '</style>',
+        f'<rect x="{min_x:.2f}" y="{min_y:.2f}" width="{width:.2f}" height="{height:.2f}" fill="white"/>',
+        *(hexagon_svg(hexagon, style, measurer) for hexagon in reporting(hexagons, progress)),
+        '</svg>'
+    ])
+
+
+# An HTML page showing the SVG inline, in a scrollable box of the given size
+def html_document(svg, width, height, title='Hexagon Layout'):
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{html.escape(title)}</title>
+</head>
+<body>
+    <div style="width:{width}px; height:{height}px; overflow:auto; border:1px solid #eee;">
+{svg}
+    </div>
+</body>
+</html>
+"""
+
+
+# Export hexagons in one pass: the SVG document is built once, written to svg_path and embedded
+# inline in the HTML page at html_path (shown in a width x height box). With png_path, a PNG is
+# rasterized too. progress, if given, is called with (done, total) as hexagons are drawn; nothing
+# is written before the SVG is complete, so a progress callback may abort the export by raising.
+# Returns the paths written
+def export_files(hexagons, style, measurer, svg_path, html_path, width, height, png_path=None, progress=None):
+    hexagons = list(hexagons)
+    total = len(hexagons) * (2 if png_path is not None else 1)
+    svg = svg_document(hexagons, style, measurer, progress and (lambda done: progress(done, total)))
+    with open(svg_path, 'w', encoding='utf-8') as svg_file:
+        svg_file.write(svg)
+    with open(html_path, 'w', encoding='utf-8') as html_file:
+        html_file.write(html_document(svg, width, height))
+
+    written = [svg_path, html_path]
+    if png_path is not None and write_png(hexagons, style, measurer, png_path,
+                                          progress and (lambda done: progress(len(hexagons) + done, total))):
+        written.append(png_path)
+    return written
+
+
+# Rasterize the hexagons to a PNG in-process. Needs Pillow, which is optional: returns False
+# (and says so) when it is not installed. progress is called as in svg_document
+def write_png(hexagons, style, measurer, png_path, progress=None):
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        print("Pillow is not installed, so no PNG was written (the SVG export does not need it).")
+        return False
+
+    hexagons = list(hexagons)
+    min_x, min_y, width, height = export_bounds(hexagons, style)
+    image = Image.new('RGB', (max(1, round(width)), max(1, round(height))), 'white')
+    draw = ImageDraw.Draw(image)
+    fonts = load_fonts(ImageFont, style)
+
+    for hexagon in reporting(hexagons, progress):
+        draw_hexagon(draw, hexagon, hexagon.x - min_x, hexagon.y - min_y, style, measurer, fonts)
+
+    image.save(png_path)
+    return True
+
+
+# Draw one hexagon onto a Pillow ImageDraw, centered on image position (x, y) and scale times its
+# size; its number and text are only drawn when there are fonts for them (see load_fonts)
+def draw_hexagon(draw, hexagon, x, y, style, measurer, fonts=None, scale=1.0):
+    draw.polygon(style.vertices(x, y, scale), fill=style.background_color, outline=style.outline_color)
+    if fonts is None:
+        return
+    text_font, number_font = fonts
+    draw.text((x, y + (7 - style.size) * scale), str(hexagon.number), fill=style.number_color, font=number_font,
+              anchor='mm')
+    lines = style.text_lines(hexagon.text, measurer)
+    line_height = style.line_height * scale
+    first_line_y = y - (len(lines) - 1) * line_height / 2
+    for index, line in enumerate(lines):
+        draw.text((x, first_line_y + index * line_height), line, fill=style.text_color, font=text_font, anchor='mm')
+
+
+# The (text, number) fonts of a style, scaled by scale
+def load_fonts(image_font, style, scale=1.0):
+    return (load_font(image_font, style.font, style.font_size * 96 / 72 * scale),
+            load_font(image_font, style.font, (style.font_size + 2) * 96 / 72 * scale))
+
+
+def load_font(image_font, font, pixel_size):
+    try:
+        return image_font.truetype(f"{font.lower()}.ttf", round(pixel_size))
+    except OSError:
+        return image_font.load_default(round(pixel_size))
@@ -1,371 +1,494 @@
 # class for drawing a hexagon, with mouse event binders for drag & drop
-import math
-from shapely.geometry import LineString
-import subprocess  # to convert ps to png
-import os  # to delete the ps file in case of successful conversion to png
-
-
-# Currently, this static function returns the distance between the midpoints of two sides, since
-# the two docking sides are parallel, any point would do.
-def distance_between_sides(side1_x1, side1_y1, side1_x2, side1_y2, side2_x1, side2_y1, side2_x2, side2_y2):
-    # calculated the distance between the midpoint of side 1 and the midpoint of side 2
-    midpoint_side1_x = (side1_x1 + side1_x2) / 2
-    midpoint_side1_y = (side1_y1 + side1_y2) / 2
-    midpoint_side2_x = (side2_x1 + side2_x2) / 2
-    midpoint_side2_y = (side2_y1 + side2_y2) / 2
-
-    distance = math.sqrt((midpoint_side2_x - midpoint_side1_x) ** 2 + (midpoint_side2_y - midpoint_side1_y) ** 2)
-
-    return distance
-
-
-# Static function to check if, during the dragging of a hexagon, its docking side
-# is fully or partially coinciding with the nearest hexagon's corresponding docking side. If so, the
-# dragged hexagon should be immediately moved to snap at midpoint, regardless of the
-# self.snap_distance value. TODO figure out why the side1.intersects(side2) never returns True
-def are_sides_coincident(side1_x1, side1_y1, side1_x2, side1_y2, side2_x1, side2_y1, side2_x2, side2_y2):
-    # Calculate the slopes of the two sides
-    slope1 = (side1_y2 - side1_y1) / (side1_x2 - side1_x1) if side1_x2 != side1_x1 else None
-    slope2 = (side2_y2 - side2_y1) / (side2_x2 - side2_x1) if side2_x2 != side2_x1 else None
-
-    # If the slopes are not equal, the sides are not parallel and do not coincide
-    if slope1 != slope2:
-        return False
-
-    # define the two sides
-    side1 = LineString([(side1_x1, side1_y1), (side1_x2, side1_y2)])
-    side2 = LineString([(side2_x1, side2_y1), (side2_x2, side2_y2)])
-
-    # Check if the two parallel sides intersect (i.e., partially coincide)
-    if side1.intersects(side2):
-        return True
-
-    # Check if the two parallel sides are equal (i.e., fully coincide)
-    if side1.equals(side2):
-        return True
-
-    # If no point on either side lies on the other, they don't coincide
-    return False
-
-
-# Function to convert the ps hexagon export to png for rendering in the exported html
-# Assumes ImageMagick is installed wherever this is executed
-def convert_ps_to_png(ps_file, png_file):
-    exported_to_png = True
-
-    try:
-        subprocess.run(["magick", ps_file, png_file], check=True)
-        os.remove(ps_file)  # delete the ps file after successful conversion to png
-    except subprocess.CalledProcessError as conversion_error:
-        print(f"Conversion failed: {conversion_error}")
-        exported_to_png = False
-    except FileNotFoundError:
-        print("ImageMagick is not installed or not in the system path.")
-        exported_to_png = False
-
-    return exported_to_png
+import os
+from board import Board
+from docking import UNIT_HEXAGON_VERTICES
+from text_metrics import tk_text_measurer
+from exporter import ExportStyle, export_files
+from tiles import export_tiles
 
 
+# Renders a Board onto a Tk canvas and turns mouse events into board operations
 class Hexagon:
-    hexagon_id = 0  # Class-level identifier to track hexagon numbers and print them on GUI
-
-    def __init__(self, canvas):
+    def __init__(self, canvas, board=None, instrumentation=None):
         self.canvas = canvas
-        self.hexagons = []  # list to store hexagon properties and elicited info text
+        self.board = board if board is not None else Board()  # hexagon positions, texts and docking
+        self.hexagons = self.board.hexagons  # hexagon records (center, elicited info text, canvas items if in view)
         self.selected_hexagon = None
-        self.drag_data = {'x': 0, 'y': 0, 'item': None}
-        self.snap_distance = 5  # to automatically snap a moving hexagon to a nearby one
-        self.size = 55
+        self.drag_data = {'x': 0, 'y': 0, 'item': None}  # item is the number of the hexagon being dragged
+        self.size = self.board.size
         self.background_color = 'orange'
         self.outline_color = 'white'
         self.font = 'Arial'
         self.font_size = 10
         self.truncation_mark = '[...]'
         self.output_dir = './output/'
-        self.cluster_ps_file = 'hexagonal_clusters.ps'  # Define cluster_ps_file for cluster output
-        self.cluster_png_file = 'hexagonal_clusters.png'  # PNG file converted from the PS file
+        self.cluster_svg_file = 'hexagonal_clusters.svg'  # SVG export of the board
+        self.cluster_png_file = 'hexagonal_clusters.png'  # PNG export of the board (needs Pillow)
+        self.html_file = 'hexagon_layout.html'  # HTML page with the SVG inline
+        self.export_png = True
+        self.tiled_export = False  # export a tile pyramid with a zoomable viewer instead (for large boards)
+        self.tiles_dir = 'tiles'  # where in output_dir the tiled export keeps its tiles
+        self.tiles_html_file = 'hexagon_tiles.html'  # HTML viewer of the tiled export
+
+        # Width measurements and wrapped texts are taken from (and cached per) font metrics
+        self.text_measurer = tk_text_measurer(self.canvas, self.font, self.font_size)
+        self.text_wrap_width = self.size * 0.85  # Define width for wrapping text
+
+        # Vertex offsets of a hexagon of this size from its center, computed once for all hexagons
+        self.vertex_offsets = [(self.size * x, self.size * y) for x, y in UNIT_HEXAGON_VERTICES]
+
+        # Viewport: hexagon centers are kept in board coordinates, and the canvas shows them scaled
+        # by the zoom factor. Canvas items only exist for hexagons in (or within viewport_margin
+        # pixels of) the visible area, and are recycled through the pools as the view moves.
+        # Below detail_zoom, text and number labels are hidden and only plain cells are drawn.
+        self.zoom = 1.0
+        self.min_zoom = 0.05
+        self.max_zoom = 4.0
+        self.detail_zoom = 0.6
+        self.viewport_margin = 100
+        self.realized = set()  # numbers of the hexagons that currently have canvas items
+        self.polygon_pool = []  # hidden polygons ready for reuse
+        self.label_pool = []  # hidden (text, number) item pairs ready for reuse
+        self.viewport_pass = None  # pending after_idle call of update_viewport
+
+        # Dragging is applied in frames: motion between two frames is summed up and applied with one
+        # move, and docking runs at most once per frame (or, with dock_when_settled, only after the
+        # pointer has rested for settle_delay milliseconds)
+        self.frame_rate = 60  # target frames per second while dragging
+        self.dock_when_settled = False
+        self.settle_delay = 120
+        self.frame_delta = [0.0, 0.0]  # movement accumulated since the last frame, in board coordinates
+        self.frame_docking = False  # whether the latest motion asked for auto-snapping
+        self.drag_frame = None  # pending after call of apply_drag_frame
+        self.settle_timer = None  # pending after call of dock_settled
+        self.cluster_drag = None  # members, canvas tag and total movement of a cluster being dragged
+        self.drag_outcome = None  # 'move' or 'dock', once the dragged hexagon has moved
+        self.lattice_snap = [0.0, 0.0]  # in lattice mode, how far snapping moved the dragged hexagon off the pointer
+
+        # Session (if any) that every change to the board is journaled to, see session.py
+        self.journal = None
+
+        # With an instrumentation (see instrumentation.py), the handlers are swapped for timed
+        # ones before they are bound
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.instrument_hexagon(self)
+
+        # Mouse events are bound once, to the tag every hexagon item carries, and resolved to
+        # the hexagon under the pointer when they fire
+        self.class_tag = 'hexagon'
+        self.bind_drag(self.class_tag)
+        self.canvas.tag_bind(self.class_tag, '<Button-1>', self.on_click, add='+')
+        self.canvas.bind('<Configure>', lambda event: self.schedule_viewport(), add='+')
 
     def draw(self, x, y, text):
-        # Increment ID
-        Hexagon.hexagon_id += 1
-
-        # Define hexagon points into a list
-        points = []
-        for i in range(6):
-            angle_deg = 60 * i + 30
-            angle_rad = math.pi / 180 * angle_deg
-            points.append(x + self.size * math.cos(angle_rad))
-            points.append(y + self.size * math.sin(angle_rad))
-        # draw hexagon with given points
-        hexagon = self.canvas.create_polygon(points, outline=self.outline_color,
-                                             fill=self.background_color, width=0.5)
-
-        # Create a unique tag for the hexagon in order to bind it later to the mouse left-click
-        # since polygons are not bound by default
-        hexagon_tag = f"hexagon_{id(hexagon)}"
-
-        # Add hexagon tag to the polygon object; then, use hexagon_tag in the
-        # self.canvas.tag_bind statement in the if-block below for toggling long texts on/ off
-        self.canvas.addtag_withtag(hexagon_tag, hexagon)
-
-        # Display hexagon ID on top vertex, and save to hexagon_number to drag when hexagon moves
-        hexagon_number = self.canvas.create_text(
-            x, y - self.size + 7,
-            text=str(Hexagon.hexagon_id),
-            font=(self.font, self.font_size + 2),
-            fill='navy'
-        )
-
-        # Define width for wrapping text:
-        text_wrap_width = self.size * 0.85
-
-        # Check if text exceeds 85% of the hexagon width
-        if self.text_exceeds_width(text, text_wrap_width):
-            text_id = self.canvas.create_text(
-                x, y,
-                text=self.wrap_text(text, text_wrap_width),
-                font=(self.font, self.font_size), fill='black'
-            )
-
-            # Store full text in a tag singleton to retrieve later when user drags hexagon
-            self.canvas.itemconfig(text_id, tags=(text,))
-
-            # Bind click event to hexagon to toggle full text visibility on or off
-            self.canvas.tag_bind(hexagon_tag, '<Button-1>',
-                                 lambda event, info_id=text_id, full_text=text: self.toggle_full_text(event, info_id,
-                                                                                                      full_text))
+        record = self.board.add(x, y, text)
+        if self.journal is not None:
+            self.journal.added(record)
+        self.schedule_viewport()
+
+    # Draw many hexagons at once from an iterable of (x, y, text). Only the board records are
+    # created here; canvas items (and wrapped texts) are made once the hexagons are in view
+    def draw_many(self, items):
+        records = self.board.add_many(items)
+        if self.journal is not None:
+            self.journal.added(*records)
+        self.schedule_viewport()
+
+    # Render hexagons already on the board, e.g. when it was filled or loaded without a canvas
+    def draw_board(self):
+        self.schedule_viewport()
+
+    # Give a hexagon canvas items, reusing pooled items when there are some. Below detail_zoom
+    # only the polygon is drawn
+    def realize(self, record):
+        x = record.x * self.zoom
+        y = record.y * self.zoom
+        points = [coordinate + offset * self.zoom for offsets in self.vertex_offsets
+                  for coordinate, offset in zip((x, y), offsets)]
+
+        # The shared per-hexagon tag moves all items with a single canvas.move when the hexagon is
+        # dragged; the class tag is the one all mouse events are bound to
+        if self.polygon_pool:
+            hexagon = self.polygon_pool.pop()
+            self.canvas.coords(hexagon, points)
+            self.canvas.itemconfig(hexagon, state='normal')
+            self.canvas.addtag_withtag(record.tag, hexagon)
         else:
-            # Draw text directly inside hexagon as is
-            text_id = self.canvas.create_text(x, y, text=text, font=(self.font, self.font_size), fill='black')
-
-        # Store hexagon data in a dictionary
-        hexagon_data = {
-            'hexagon': hexagon,
-            'text_id': text_id,
-            'hexagon_number': hexagon_number,
-            'x': x,
-            'y': y,
-            'text': text
-        }
-        self.hexagons.append(hexagon_data)  # List of hexagon dictionaries
-
-        # Bind drag events
-        self.bind_drag(hexagon)
-
+            hexagon = self.canvas.create_polygon(points, outline=self.outline_color, fill=self.background_color,
+                                                 width=0.5, tags=(record.tag, self.class_tag))
+
+        if self.zoom < self.detail_zoom:
+            self.hexagons.attach(record, hexagon)
+            self.realized.add(record.number)
+            return
+
+        text_font = (self.font, max(1, round(self.font_size * self.zoom)))
+        number_font = (self.font, max(1, round((self.font_size + 2) * self.zoom)))
+        number_y = y + (7 - self.size) * self.zoom
+        if self.label_pool:
+            text_id, hexagon_number = self.label_pool.pop()
+            self.canvas.coords(hexagon_number, x, number_y)
+            self.canvas.itemconfig(hexagon_number, text=str(record.number), font=number_font, state='normal')
+            self.canvas.coords(text_id, x, y)
+            self.canvas.itemconfig(text_id, font=text_font, state='normal')
+            self.canvas.addtag_withtag(record.tag, text_id)
+            self.canvas.addtag_withtag(record.tag, hexagon_number)
+            # Labels must stay above the (possibly newer) polygon they are reused for
+            self.canvas.tag_raise(text_id, hexagon)
+            self.canvas.tag_raise(hexagon_number, hexagon)
+        else:
+            # Display hexagon ID on top vertex, and the elicited information text in the middle
+            tags = (record.tag, self.class_tag)
+            hexagon_number = self.canvas.create_text(x, number_y, text=str(record.number), font=number_font,
+                                                     fill='navy', tags=tags)
+            text_id = self.canvas.create_text(x, y, font=text_font, fill='black', tags=tags)
+
+        self.hexagons.attach(record, hexagon, text_id, hexagon_number)
+        self.show_text(record)
+        self.realized.add(record.number)
+
+    # Hide a hexagon's canvas items and put them back in the pools
+    def release(self, record):
+        hexagon, text_id, hexagon_number = self.hexagons.detach(record)
+        self.canvas.dtag(record.tag, record.tag)
+        self.canvas.itemconfig(hexagon, state='hidden')
+        self.polygon_pool.append(hexagon)
+        if text_id is not None:
+            self.canvas.itemconfig(text_id, state='hidden')
+            self.canvas.itemconfig(hexagon_number, state='hidden')
+            self.label_pool.append((text_id, hexagon_number))
+        self.realized.discard(record.number)
+
+    def show_text(self, record):
+        # Check if text exceeds 85% of the hexagon width; if so, wrap it, else draw it as is.
+        # Wrapping is done in board coordinates, so the lines fit at any zoom with a scaled font
+        if not record.expanded and self.text_exceeds_width(record.text, self.text_wrap_width):
+            self.canvas.itemconfig(record.text_id, text=self.wrap_text(record.text, self.text_wrap_width))
+        else:
+            self.canvas.itemconfig(record.text_id, text=record.text)
+
+    def schedule_viewport(self):
+        if self.viewport_pass is None:
+            self.viewport_pass = self.canvas.after_idle(self.update_viewport)
+
+    # Make the canvas items match the visible part of the board: realize the hexagons that came
+    # into view, release the ones that left it, and drop pooled items beyond what may be reused
+    def update_viewport(self):
+        self.viewport_pass = None
+        if self.cluster_drag is not None:  # its members' board positions lag behind until release
+            return
+        self.update_scroll_region()
+
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1:  # not mapped yet, so fall back on the requested size
+            width = int(self.canvas.cget('width'))
+            height = int(self.canvas.cget('height'))
+        left = self.canvas.canvasx(0) / self.zoom
+        top = self.canvas.canvasy(0) / self.zoom
+        margin = (self.viewport_margin / self.zoom) + self.size
+
+        visible = set(self.board.within(left - margin, top - margin,
+                                                left + width / self.zoom + margin, top + height / self.zoom + margin))
+        if self.drag_data['item'] is not None:
+            visible.add(self.drag_data['item'])  # never take the items from under the pointer
+
+        for number in self.realized - visible:
+            self.release(self.hexagons[number])
+        for number in visible - self.realized:
+            self.realize(self.hexagons[number])
+
+        keep = max(len(self.realized), 256)
+        for _ in range(len(self.polygon_pool) - keep):
+            self.canvas.delete(self.polygon_pool.pop())
+        for _ in range(len(self.label_pool) - keep):
+            self.canvas.delete(*self.label_pool.pop())
+
+    # Let the canvas scroll over the whole board (and its origin) at the current zoom
+    def update_scroll_region(self):
+        if self.board.bounds is None:
+            return
+        min_x, min_y, max_x, max_y = self.board.bounds
+        self.canvas.configure(scrollregion=(
+            min(0, min_x - 2 * self.size) * self.zoom, min(0, min_y - 2 * self.size) * self.zoom,
+            (max_x + 2 * self.size) * self.zoom, (max_y + 2 * self.size) * self.zoom
+        ))
+
+    # Zoom by factor, keeping the board point under the window position (window_x, window_y) in place
+    def zoom_by(self, factor, window_x, window_y):
+        zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        if zoom == self.zoom or self.cluster_drag is not None or self.board.bounds is None:  # nothing to zoom into
+            return
+        board_x = self.canvas.canvasx(window_x) / self.zoom
+        board_y = self.canvas.canvasy(window_y) / self.zoom
+
+        # Every realized hexagon is redrawn at the new scale from the pool. A dragged hexagon is
+        # released last and realized first, so that it gets back the very items under the pointer
+        # (which keep receiving the drag events)
+        dragged = self.drag_data['item']
+        for number in list(self.realized):
+            if number != dragged:
+                self.release(self.hexagons[number])
+        redraw_dragged = dragged in self.realized
+        if redraw_dragged:
+            self.release(self.hexagons[dragged])
+        self.zoom = zoom
+        if redraw_dragged:
+            self.realize(self.hexagons[dragged])
+        self.update_scroll_region()
+
+        # Scroll so that the same board point ends up under the pointer again
+        region = [float(value) for value in str(self.canvas.cget('scrollregion')).split()]
+        self.canvas.xview_moveto((board_x * zoom - window_x - region[0]) / (region[2] - region[0]))
+        self.canvas.yview_moveto((board_y * zoom - window_y - region[1]) / (region[3] - region[1]))
+        self.update_viewport()
+
+    # Text items are centered on their anchor, so the right edge of their bounding box (which is
+    # what this check has always compared against width) sits at half the measured text width
     def text_exceeds_width(self, text, width):
-        # Check if the text exceeds the specified width
-        return self.canvas.bbox(self.canvas.create_text(0, 0, text=text, font=(self.font, self.font_size)))[2] > width
+        # Check if the text exceeds the specified width, from the cached font metrics
+        return self.text_measurer.width(text) / 2 > width
 
     # Given elicited information text, split it word by word such that the split words form
     # lines that fit into the hexagon's width. If the total number of lines exceed the
-    # hexagon's height, use the truncate_text method separately inside the draw_hexagon method
+    # hexagon's height, the last line is replaced by the truncation mark. Results are cached
+    # per font, so re-wrapping the same text (e.g., when toggling) costs a dictionary lookup
     def wrap_text(self, text, width):
-        # Split text into lines, such that each split line fits within the hexagon width,
-        # and if the split lines exceed the hexagon's height, truncate them:
-        # Define hexagon height, given hexagon_size:
+        # Define hexagon height, given hexagon_size; each line contributes its font size to the height
         hexagon_height = self.size * 0.85
-        current_text_height = 0  # record current text height for each wrapped line
-
-        lines = []
-        words = text.split()
-        while words:
-            line = words.pop(0)
+        return self.text_measurer.wrap(text, 2 * width, hexagon_height, self.font_size, self.truncation_mark)
 
-            while words and not self.text_exceeds_width(' '.join([line, words[0]]), width):
-                line = ' '.join([line, words.pop(0)])
-            lines.append(line + '\n')  # break lines to fit into hexagon
-
-            current_text_height += self.font_size  # each line contributes its font size to the height
-            # check if current text height exceeds the hexagon height:
-            if current_text_height > hexagon_height:
-                # Truncate the last line and break
-                lines[-1] = self.truncation_mark.strip('\n')  # replace previous line with truncation mark
-                break
-
-        return ''.join(lines)  # concatenate list of lines into a string
+    # Clicking a hexagon whose text does not fit toggles between its full and wrapped text
+    def on_click(self, event):
+        record = self.event_record(event)
+        if record is not None and record.text_id is not None and \
+                self.text_exceeds_width(record.text, self.text_wrap_width):
+            self.toggle_full_text(event, record.text_id, record.text)
 
     def toggle_full_text(self, event, text_id, full_text):
         current_text = self.canvas.itemcget(text_id, 'text')
+        expanded = current_text.endswith(self.truncation_mark)
 
-        if current_text.endswith(self.truncation_mark):
+        if expanded:
             # Show full text
             self.canvas.itemconfig(text_id, text=full_text)
         else:
             # Show truncated text
-            text_wrap_width = self.size * 0.85
-            self.canvas.itemconfig(text_id, text=self.wrap_text(full_text, text_wrap_width))
-
-    def bind_drag(self, hexagon):
-        self.canvas.tag_bind(hexagon, '<ButtonPress-1>', self.on_drag_start)
-        self.canvas.tag_bind(hexagon, '<ButtonRelease-1>', self.on_drag_end)
-        self.canvas.tag_bind(hexagon, '<B1-Motion>', self.on_drag_motion)
+            self.canvas.itemconfig(text_id, text=self.wrap_text(full_text, self.text_wrap_width))
+
+        # Remember the choice, so the text stays that way when the hexagon is drawn again
+        record = self.hexagons.find(text_id)
+        if record is not None:
+            record.expanded = expanded
+            if self.journal is not None:
+                self.journal.toggled(record)
+
+    # Bind drag events to a tag; the press binding is added rather than replacing the toggle
+    # binding that may already sit on the same tag and event
+    def bind_drag(self, tag):
+        self.canvas.tag_bind(tag, '<ButtonPress-1>', self.on_drag_start, add='+')
+        self.canvas.tag_bind(tag, '<ButtonRelease-1>', self.on_drag_end)
+        self.canvas.tag_bind(tag, '<B1-Motion>', self.on_drag_motion)
+
+    # Resolve the hexagon an event fired on: the item under the pointer may be the polygon,
+    # its text or its number, and the registry maps each of them back to the hexagon
+    def event_record(self, event):
+        items = self.canvas.find_withtag('current') or \
+            event.widget.find_closest(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        return self.hexagons.find(items[0]) if items else None
 
     def on_drag_start(self, event):
         # Determine which hexagon was clicked
-        self.selected_hexagon = event.widget.find_closest(event.x, event.y)[0]
+        record = self.event_record(event)
+        self.selected_hexagon = record.number if record is not None else None
 
         # Store drag data, so that we move any text and hexagon number associated with this hexagon
         self.drag_data['item'] = self.selected_hexagon
         self.drag_data['x'] = event.x
         self.drag_data['y'] = event.y
 
+        # Shift + Ctrl drags the hexagon's whole cluster: the drawn items of all its members get one
+        # shared tag, so every frame is a single canvas.move; the board is updated on release
+        if self.selected_hexagon is not None and event.state & 0x1 and event.state & 0x4:
+            members = self.board.clusters.cluster_of(self.selected_hexagon)
+            if len(members) > 1:
+                self.cluster_drag = {'members': list(members), 'tag': f"cluster_{self.selected_hexagon}",
+                                     'dx': 0.0, 'dy': 0.0}
+                for number in members:
+                    record = self.hexagons[number]
+                    if record.realized:
+                        self.canvas.addtag_withtag(self.cluster_drag['tag'], record.tag)
+
     def on_drag_end(self, event):
+        # Apply whatever movement and docking the last frame had not shown yet
+        self.apply_drag_frame()
+        if self.settle_timer is not None:
+            self.canvas.after_cancel(self.settle_timer)
+            self.settle_timer = None
+            self.check_for_docking()
+
+        # Put a dragged cluster in its new place on the board (in lattice mode, moved by whole cells)
+        if self.cluster_drag is not None:
+            if self.board.lattice:
+                dx, dy = self.board.lattice_translation(self.cluster_drag['dx'], self.cluster_drag['dy'])
+                self.canvas.move(self.cluster_drag['tag'], (dx - self.cluster_drag['dx']) * self.zoom,
+                                 (dy - self.cluster_drag['dy']) * self.zoom)
+                self.cluster_drag['dx'] = dx
+                self.cluster_drag['dy'] = dy
+            self.board.move_many(self.cluster_drag['members'], self.cluster_drag['dx'], self.cluster_drag['dy'])
+            self.canvas.dtag(self.cluster_drag['tag'], self.cluster_drag['tag'])
+            if self.journal is not None and (self.cluster_drag['dx'] or self.cluster_drag['dy']):
+                self.journal.moved_cluster(self.cluster_drag['members'], self.cluster_drag['dx'],
+                                           self.cluster_drag['dy'])
+            self.cluster_drag = None
+
+        # Dock the dragged hexagon to (and separate it from) its neighbours where it was dropped, once
+        # per drag rather than once per frame, then journal where it ended up
+        if self.drag_outcome is not None:
+            self.board.update_adjacency(self.drag_data['item'])
+        if self.journal is not None and self.drag_outcome is not None:
+            record = self.hexagons[self.drag_data['item']]
+            if self.drag_outcome == 'dock':
+                self.journal.docked(record)
+            else:
+                self.journal.moved(record)
+        self.drag_outcome = None
+        self.lattice_snap = [0.0, 0.0]
+
         # Reset selected hexagon and data
         self.selected_hexagon = None
         self.drag_data['item'] = None
         self.drag_data['x'] = 0
         self.drag_data['y'] = 0
 
+        # The board may have grown, and the hexagon may have been dropped outside the viewport
+        self.schedule_viewport()
+
+    # Motion events only accumulate the pointer movement; it is applied once per frame by
+    # apply_drag_frame, so that the cost of a drag follows the frame rate rather than the
+    # (much higher) rate at which the mouse or trackpad reports motion
     def on_drag_motion(self, event):
-        # Calculate movement distance
-        dx = event.x - self.drag_data['x']
-        dy = event.y - self.drag_data['y']
+        if self.drag_data['item'] is None:
+            return
 
-        # TODO sometimes, by accident?, the text moves instead of the
-        #      hexagon -- ensure this never happens with Tkinter
-        # Move the hexagon and its associated text
-        self.canvas.move(self.drag_data['item'], dx, dy)
-        self.canvas.move(self.get_text_id(self.drag_data['item']), dx, dy)
-        self.canvas.move(self.get_hexagon_number(self.drag_data['item']), dx, dy)
+        # Accumulate movement distance, in board coordinates
+        self.frame_delta[0] += (event.x - self.drag_data['x']) / self.zoom
+        self.frame_delta[1] += (event.y - self.drag_data['y']) / self.zoom
 
         # Update drag data
         self.drag_data['x'] = event.x
         self.drag_data['y'] = event.y
 
         # Check if any of the shift keys is pressed to activate auto-snapping
-        if event.state & 0x1 or event.state & 0x2 or event.state & 0x2000:
+        self.frame_docking = bool(event.state & 0x1 or event.state & 0x2 or event.state & 0x2000)
+
+        if self.drag_frame is None:
+            self.drag_frame = self.canvas.after(max(1, 1000 // self.frame_rate), self.apply_drag_frame)
+
+    # Move the dragged hexagon by the movement accumulated since the last frame, then dock it
+    # (at most once per frame), or wait until the pointer settles if dock_when_settled is set
+    def apply_drag_frame(self):
+        if self.drag_frame is not None:
+            self.canvas.after_cancel(self.drag_frame)
+            self.drag_frame = None
+        dx, dy = self.frame_delta
+        self.frame_delta = [0.0, 0.0]
+        if self.drag_data['item'] is None or (dx == 0 and dy == 0):
+            return
+
+        # A dragged cluster moves as a whole, without docking
+        if self.cluster_drag is not None:
+            self.canvas.move(self.cluster_drag['tag'], dx * self.zoom, dy * self.zoom)
+            self.cluster_drag['dx'] += dx
+            self.cluster_drag['dy'] += dy
+            return
+
+        # In lattice mode, the hexagon is moved from where the pointer has it rather than from the cell it
+        # last snapped to, or else small moves would keep snapping it back to the same cell
+        if self.board.lattice:
+            dx -= self.lattice_snap[0]
+            dy -= self.lattice_snap[1]
+            self.lattice_snap = [0.0, 0.0]
+
+        # Move the hexagon and its associated text and number
+        self.move_hexagon(self.hexagons[self.drag_data['item']], dx, dy)
+        self.drag_outcome = 'move'
+
+        if self.settle_timer is not None:
+            self.canvas.after_cancel(self.settle_timer)
+            self.settle_timer = None
+        if self.frame_docking:
             # see what's nearby to begin docking, given the hexagon being dragged
+            if self.dock_when_settled:
+                self.settle_timer = self.canvas.after(self.settle_delay, self.dock_settled)
+            else:
+                self.check_for_docking()
+
+    def dock_settled(self):
+        self.settle_timer = None
+        if self.drag_data['item'] is not None:
             self.check_for_docking()
 
     def check_for_docking(self):
-        dragged_item = self.drag_data['item']  # ID of the hexagon being dragged
-        dragged_item_coords = self.canvas.coords(dragged_item)  # coordinates of hexagon being moved
-
-        # Iterate through all hexagons to find the nearest hexagon to dragged_item (hexagon being moved)
-        already_snapped = False
-        for hexagon_data in self.hexagons:
-            hexagon = hexagon_data['hexagon']
-
-            if hexagon == dragged_item:  # skip hexagon being dragged
-                continue
-
-            # if docking between multiple hexagons, snap only once, or else it shifts behind the
-            # group of hexagons that are already docked
-            if already_snapped:
-                break
-
-            hex_coords = self.canvas.coords(hexagon)
-
-            # Iterate through each side of the current hexagon to find the closest two sides
-            # between it and the hexagon being dragged.
-            for dragged_side_index in range(6):
-                # Coordinates of the side of the hexagon being dragged
-                dragged_side_x_start = dragged_item_coords[2 * dragged_side_index]
-                dragged_side_y_start = dragged_item_coords[2 * dragged_side_index + 1]
-                dragged_side_x_end = dragged_item_coords[2 * ((dragged_side_index + 1) % 6)]
-                dragged_side_y_end = dragged_item_coords[2 * ((dragged_side_index + 1) % 6) + 1]
-
-                for hex_side_index in range(6):
-                    # Coordinates of the sides of the current hexagon
-                    hex_side_x_start = hex_coords[2 * hex_side_index]
-                    hex_side_y_start = hex_coords[2 * hex_side_index + 1]
-                    hex_side_x_end = hex_coords[2 * ((hex_side_index + 1) % 6)]
-                    hex_side_y_end = hex_coords[2 * ((hex_side_index + 1) % 6) + 1]
-
-                    # Calculate distances between the midpoints of the sides of dragged hexagon
-                    # and current hexagon (because the sides are parallel, any coord would do)
-                    current_distance_between_sides = distance_between_sides(
-                        dragged_side_x_start, dragged_side_y_start, dragged_side_x_end, dragged_side_y_end,
-                        hex_side_x_start, hex_side_y_start, hex_side_x_end, hex_side_y_end
-                    )
-
-                    # Check if the two sides partially coincide, so that the snapping happens
-                    # regardless of the snapping distance
-                    sides_coincide = are_sides_coincident(dragged_side_x_start, dragged_side_y_start,
-                                                          dragged_side_x_end, dragged_side_y_end,
-                                                          hex_side_x_start, hex_side_y_start, hex_side_x_end,
-                                                          hex_side_y_end)
-
-                    # Dock as you go if any of the current hexagon's sides to any of the
-                    # dragged hexagon's sides is less than the snapping distance, or if the two sides
-                    # are already coincident, in which case just dock them at midpoint
-                    if current_distance_between_sides < self.snap_distance or sides_coincide:
-                        # Closest hexagon's closest side's coordinates:
-                        docking_midpoint_x = (hex_side_x_start + hex_side_x_end) / 2
-                        docking_midpoint_y = (hex_side_y_start + hex_side_y_end) / 2
-
-                        # Calculate the midpoint of the dragged hexagon's side
-                        dragged_midpoint_x = (dragged_side_x_start + dragged_side_x_end) / 2
-                        dragged_midpoint_y = (dragged_side_y_start + dragged_side_y_end) / 2
-
-                        # Calculate the delta x and delta y to move the dragged hexagon to align
-                        # with the nearest hexagon's side based on the docking position and the side indices
-                        dx = docking_midpoint_x - dragged_midpoint_x
-                        dy = docking_midpoint_y - dragged_midpoint_y
-
-                        # Move the dragged hexagon and its associated text and number
-                        self.canvas.move(dragged_item, dx, dy)
-                        self.canvas.move(self.get_text_id(dragged_item), dx, dy)
-                        self.canvas.move(self.get_hexagon_number(dragged_item), dx, dy)
-
-                        already_snapped = True
+        # Ask the board how the dragged hexagon docks onto its nearest neighbour, if any, and move
+        # it there. Docking between multiple hexagons snaps only once, or else it shifts behind
+        # the group of hexagons already docked. In lattice mode, it snaps to the nearest free cell
+        move = self.board.find_docking(self.drag_data['item'])
+        if move is not None:
+            self.move_hexagon(self.hexagons[self.drag_data['item']], *move)
+            self.drag_outcome = 'dock'
+            if self.board.lattice:
+                self.lattice_snap[0] += move[0]
+                self.lattice_snap[1] += move[1]
+
+    # Move a hexagon by (dx, dy) board pixels: its polygon, number and text move together through
+    # their shared tag (if it is drawn), and the board keeps its center and index in step. Which
+    # hexagons it is docked to is only worked out once it is dropped (see on_drag_end)
+    def move_hexagon(self, record, dx, dy):
+        if record.realized:
+            self.canvas.move(record.tag, dx * self.zoom, dy * self.zoom)
+        self.board.place(record.number, dx, dy)
 
     def get_text_id(self, hexagon_id):
         # Find text_id associated with hexagon_id, so we drag the
         # elicited information (stored in text) along with corresponding hexagon
-        for hexagon in self.hexagons:
-            if hexagon['hexagon'] == hexagon_id:
-                return hexagon['text_id']
-        return None
+        record = self.hexagons.find(hexagon_id)
+        return record.text_id if record is not None else None
 
     def get_hexagon_number(self, hexagon_id):
-        # Find the hexagon_number associated with hexagon_id, so we drag the
-        # elicited information (stored in text) along with corresponding hexagon
-        for hexagon in self.hexagons:
-            if hexagon['hexagon'] == hexagon_id:
-                return hexagon['hexagon_number']
-        return None
+        # Find the hexagon_number associated with hexagon_id
+        record = self.hexagons.find(hexagon_id)
+        return record.hexagon_number if record is not None else None
+
+    def export_style(self):
+        return ExportStyle(self.size, self.background_color, self.outline_color, self.font, self.font_size,
+                           self.truncation_mark)
 
+    # Export the whole board (not just what is on screen) straight from the hexagon records: an
+    # SVG file, an HTML page showing it inline in a width x height box and, if enabled, a PNG
+    # (or, with tiled_export, a tile pyramid and an HTML viewer of it, see tiles.py)
     def export_to_html(self, width, height):
-        # Create the PostScript file with canvas data
-        self.canvas.postscript(file=self.output_dir + self.cluster_ps_file, colormode='color')
-
-        # attempt ps->png conversion. if good, use the png file, else reference the ps for
-        # the user to manually export to png with whatever program
-        if convert_ps_to_png(self.output_dir + self.cluster_ps_file,
-                             self.output_dir + self.cluster_png_file):
-            img_src = self.cluster_png_file
-        else:
-            img_src = 'Error: Convert ps to png'
-
-        # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Hexagon Layout</title>
-            <script type="text/javascript">
-                function drawHexagons() {{
-                    var canvas = document.getElementById('hexagonCanvas');
-                    var ctx = canvas.getContext('2d');
-
-                    var img = new Image();
-                    img.onload = function() {{
-                        ctx.drawImage(img, 0, 0);
-                    }};
-                    img.src = '{img_src}';
-                }}
-            </script>
-        </head>
-        <body onload="drawHexagons()">
-            <canvas id="hexagonCanvas" width="{width}" height="{height}" style="border:1px solid #eee;">
-                Your browser does not support the HTML5 canvas tag.
-            </canvas>
-        </body>
-        </html>
-        """
-
-        # Write HTML content to a file in the current directory
-        with open('output/hexagon_layout.html', 'w') as html_file:
-            html_file.write(html_content)
-        html_file.close()
+        return self.export_job(width, height)(None)
+
+    # Take what an export needs on the Tk thread (a snapshot of the hexagons, the export style and
+    # a text measurer that no longer calls into Tk), and return the export itself as a job that
+    # can run on any thread: job(progress) writes the files and returns their paths
+    def export_job(self, width, height):
+        hexagons = self.board.snapshot()
+        measurer = self.text_measurer.detached({word for hexagon in hexagons for word in hexagon.text.split()})
+        style = self.export_style()
+        svg_path = self.output_dir + self.cluster_svg_file
+        html_path = self.output_dir + self.html_file
+        png_path = self.output_dir + self.cluster_png_file if self.export_png else None
+        tiles_dir = self.output_dir + self.tiles_dir
+        tiles_html_path = self.output_dir + self.tiles_html_file
+        tiled_export = self.tiled_export
+
+        def job(progress):
+            os.makedirs(self.output_dir, exist_ok=True)
+            if tiled_export:
+                return export_tiles(hexagons, style, measurer, tiles_dir, tiles_html_path, width, height,
+                                    progress=progress)
+            return export_files(hexagons, style, measurer, svg_path, html_path, width, height, png_path, progress)
+        return job
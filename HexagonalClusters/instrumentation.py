@@ -0,0 +1,188 @@
+# Optional instrumentation of the interactive hot paths: latency histograms of the event handlers
+# of Hexagon and HexagonClusterApp, how many docking candidates each docking check examined, and
+# how many canvas items exist. Nothing is measured unless an Instrumentation is handed to them: it
+# then replaces their handlers, on that one instance, by timed wrappers, so the code paths of an
+# uninstrumented app are untouched. An overlay on the canvas can show frame times and the item count
+# live, and all stats can be dumped to json (e.g. on exit)
+import collections
+import functools
+import json
+import math
+import time
+
+# Hexagon methods timed as they are; drag frames are timed separately, together with the Tk redraw
+hexagon_handlers = ('on_click', 'on_drag_start', 'on_drag_motion', 'on_drag_end', 'check_for_docking', 'show_text',
+                    'text_exceeds_width', 'wrap_text', 'update_viewport', 'zoom_by')
+app_handlers = ('on_mouse_wheel', 'add_hexagons', 'export_to_html')
+
+
+# Distribution of values in power-of-two buckets: constant memory however many values are added
+class Histogram:
+    def __init__(self, unit):
+        self.unit = unit
+        self.buckets = collections.Counter()  # bucket b holds values from 2**(b - 1) up to 2**b (b = 0: below 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[math.frexp(value)[1] if value >= 1 else 0] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    # Estimate of the value below which the given fraction of values lie: the upper end of its bucket
+    def percentile(self, fraction):
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= fraction * self.count:
+                return min(2 ** bucket, self.max)
+        return self.max
+
+    def stats(self):
+        return {'unit': self.unit, 'count': self.count, 'mean': self.total / self.count if self.count else 0,
+                'p50': self.percentile(0.5), 'p95': self.percentile(0.95), 'p99': self.percentile(0.99),
+                'max': self.max,
+                'buckets': {str(2 ** bucket): self.buckets[bucket] for bucket in sorted(self.buckets)}}
+
+
+class Instrumentation:
+    overlay_interval = 250  # milliseconds between two overlay refreshes
+    recent_frames = 120  # drag frames the overlay's frame time percentile is taken over
+
+    def __init__(self):
+        self.histograms = {}  # name -> Histogram
+        self.gauges = {}  # name -> {'last': value, 'max': value}
+        self.frames = collections.deque(maxlen=self.recent_frames)  # durations of the latest drag frames, in ms
+        self.overlay = None  # (text, background) canvas items of the overlay
+
+    def histogram(self, name, unit='us'):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(unit)
+        return histogram
+
+    def gauge(self, name, value):
+        gauge = self.gauges.setdefault(name, {'last': value, 'max': value})
+        gauge['last'] = value
+        gauge['max'] = max(gauge['max'], value)
+
+    # Wrap function so that every call adds its duration, in microseconds, to the named histogram
+    def timed(self, name, function):
+        histogram = self.histogram(name)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add((perf_counter() - start) * 1e6)
+        return timed_function
+
+    def instrument(self, target, names):
+        for name in names:
+            setattr(target, name, self.timed(f"{type(target).__name__}.{name}", getattr(target, name)))
+
+    # Time the handlers of a Hexagon. Has to happen before it binds them to the canvas (Hexagon
+    # does this itself when given an instrumentation)
+    def instrument_hexagon(self, hexagon):
+        self.instrument(hexagon, hexagon_handlers)
+
+        # How many docking candidates each docking check examined, from the board's running total
+        check_for_docking = hexagon.check_for_docking
+        candidates = self.histogram('docking candidates', 'hexagons')
+
+        def counted_check_for_docking():
+            examined = hexagon.board.docking_candidates
+            check_for_docking()
+            candidates.add(hexagon.board.docking_candidates - examined)
+        hexagon.check_for_docking = counted_check_for_docking
+
+        # A drag frame is the frame callback (moving and docking) plus the Tk redraw it causes,
+        # which is forced right away so that it can be timed
+        apply_drag_frame = hexagon.apply_drag_frame
+        frame_callback = self.histogram('Hexagon.apply_drag_frame')
+        redraw = self.histogram('Tk redraw')
+        drag_frames = self.histogram('drag frame')
+
+        def timed_apply_drag_frame():
+            if hexagon.frame_delta == [0.0, 0.0]:  # nothing to draw (e.g. the final flush on release)
+                return apply_drag_frame()
+            start = time.perf_counter()
+            apply_drag_frame()
+            applied = time.perf_counter()
+            hexagon.canvas.update_idletasks()
+            end = time.perf_counter()
+            frame_callback.add((applied - start) * 1e6)
+            redraw.add((end - applied) * 1e6)
+            drag_frames.add((end - start) * 1e6)
+            self.frames.append((end - start) * 1e3)
+        hexagon.apply_drag_frame = timed_apply_drag_frame
+
+        # Canvas items are counted after every viewport pass, the one place their number changes
+        update_viewport = hexagon.update_viewport
+
+        def sampled_update_viewport():
+            update_viewport()
+            self.sample(hexagon)
+        hexagon.update_viewport = sampled_update_viewport
+
+    def instrument_app(self, app):
+        self.instrument(app, app_handlers)
+
+    # Record the canvas item count, and how many hexagons are drawn or pooled
+    def sample(self, hexagon):
+        self.gauge('canvas items', len(hexagon.canvas.find_all()))
+        self.gauge('realized hexagons', len(hexagon.realized))
+        self.gauge('pooled items', len(hexagon.polygon_pool) + 2 * len(hexagon.label_pool))
+
+    # Keep an overlay in the top left corner of the canvas view with the latest drag frame times,
+    # the docking time and the canvas item count, refreshed every overlay_interval milliseconds
+    def show_overlay(self, hexagon):
+        canvas = hexagon.canvas
+        if 'canvas items' not in self.gauges:
+            self.sample(hexagon)
+        text = self.overlay_text()
+        x = canvas.canvasx(0) + 8
+        y = canvas.canvasy(0) + 8
+        if self.overlay is None:
+            background = canvas.create_rectangle(0, 0, 0, 0, fill='white', outline='gray70',
+                                                 tags=('instrumentation',))
+            label = canvas.create_text(x, y, text=text, anchor='nw', font=('Courier', 9), fill='gray20',
+                                       tags=('instrumentation',))
+            self.overlay = (label, background)
+        label, background = self.overlay
+        canvas.coords(label, x, y)
+        canvas.itemconfig(label, text=text)
+        left, top, right, bottom = canvas.bbox(label)
+        canvas.coords(background, left - 4, top - 2, right + 4, bottom + 2)
+        canvas.tag_raise(background)
+        canvas.tag_raise(label)
+        canvas.after(self.overlay_interval, self.show_overlay, hexagon)
+
+    def overlay_text(self):
+        lines = []
+        if self.frames:
+            frames = sorted(self.frames)
+            lines.append(f"drag frame {self.frames[-1]:6.1f} ms  "
+                         f"p50 {frames[len(frames) // 2]:6.1f}  p95 {frames[int(0.95 * (len(frames) - 1))]:6.1f}")
+        else:
+            lines.append("drag frame      - ms")
+        docking = self.histograms.get('Hexagon.check_for_docking')
+        if docking is not None and docking.count:
+            lines.append(f"docking    {docking.total / docking.count / 1e3:6.2f} ms  "
+                         f"candidates {self.histograms['docking candidates'].percentile(0.5):.0f}")
+        lines.append(f"items      {self.gauges['canvas items']['last']:,} "
+                     f"({self.gauges['realized hexagons']['last']:,} hexagons drawn)")
+        return '\n'.join(lines)
+
+    def stats(self):
+        return {'histograms': {name: histogram.stats() for name, histogram in sorted(self.histograms.items())},
+                'gauges': self.gauges}
+
+    def dump(self, json_path):
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(self.stats(), json_file, indent=1)
@@ -0,0 +1,64 @@
+# Axial coordinates (q, r) on the pointy-top hexagon lattice that Hexagon.draw uses: hexagons at
+# neighbouring lattice cells are exactly docked, side to side
+import math
+
+# Axial offsets of the six neighbours of a cell, starting east and going clockwise on screen
+AXIAL_DIRECTIONS = ((1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1))
+
+
+def axial_to_pixel(q, r, size):
+    return size * math.sqrt(3) * (q + r / 2), size * 1.5 * r
+
+
+# Fractional axial coordinates of a pixel position
+def pixel_to_axial(x, y, size):
+    return (math.sqrt(3) / 3 * x - y / 3) / size, (2 / 3 * y) / size
+
+
+# Round fractional axial coordinates to the cell that contains them (via cube coordinates)
+def axial_round(q, r):
+    s = -q - r
+    rounded_q, rounded_r, rounded_s = round(q), round(r), round(s)
+    q_difference = abs(rounded_q - q)
+    r_difference = abs(rounded_r - r)
+    s_difference = abs(rounded_s - s)
+    if q_difference > r_difference and q_difference > s_difference:
+        rounded_q = -rounded_r - rounded_s
+    elif r_difference > s_difference:
+        rounded_r = -rounded_q - rounded_s
+    return int(rounded_q), int(rounded_r)
+
+
+# Cells at exactly radius steps from (q, r)
+def ring(q, r, radius):
+    if radius == 0:
+        yield q, r
+        return
+    # start radius steps towards the fifth direction, then walk radius steps along each side
+    q += AXIAL_DIRECTIONS[4][0] * radius
+    r += AXIAL_DIRECTIONS[4][1] * radius
+    for direction_q, direction_r in AXIAL_DIRECTIONS:
+        for _ in range(radius):
+            yield q, r
+            q += direction_q
+            r += direction_r
+
+
+# The first count cells of a spiral around (0, 0), ring by ring: a compact, fully docked blob
+def spiral(count):
+    radius = 0
+    while count > 0:
+        for cell in ring(0, 0, radius):
+            if count == 0:
+                return
+            yield cell
+            count -= 1
+        radius += 1
+
+
+# Number of rings (beyond the center cell) a spiral of count cells reaches out to
+def spiral_radius(count):
+    radius = 0
+    while 3 * radius * (radius + 1) + 1 < count:
+        radius += 1
+    return radius
@@ -1,42 +1,108 @@
-import app as app
-import csv  # to read input file
-import elicited_information as elicited_info
-
-# read source data (elicited information)
-# the csv file contains two columns: source and elicited information text
-csv_file = open('input/elicited_information.csv', 'r')
-csv_reader = csv.reader(csv_file)
-
-elicited_information = []  # list of elicited information objects
-for record in csv_reader:
-    if record[0] == 'source':  # skip header line in csv
-        continue
-
-    # instantiate new elicited info object
-    information = elicited_info.ElicitedInformation(source=record[0], information=record[1])
-    elicited_information.append(information)
-
-csv_file.close()
-
-# invoke the app GUI with initial dimensions
-width = 900
-height = 600
-root = app.tk.Tk()
-app = app.HexagonClusterApp(root, width, height)
-
-# Add hexagons starting at (100, 100)
-x = 100
-y = 100
-for information in elicited_information:
-    app.add_hexagon(x, y, information.information)
-    if x < width - 100:
-        x += 100
-        y = 100
+import argparse
+import functools
+import glob
+
+from elicited_information import load_elicited_information, stream_elicited_information
+from board import grid_layout, lattice_layout
+from affinity import affinity_layout
+from session import Session
+from instrumentation import Instrumentation
+
+
+# Open the GUI on the elicited information of one csv file. With session_path, the board is kept
+# in that session: an existing session is reopened as it was left (and the csv file is not read),
+# otherwise a new one is started with the board imported from the csv file. With instrumentation_path,
+# the hot paths are timed and the stats written there on exit; overlay shows them on the board
+def run_gui(csv_path, width, height, affinity=False, session_path=None, tiles=False, instrumentation_path=None,
+            overlay=False, lattice=False):
+    import app as app  # only the GUI needs Tk
+
+    # invoke the app GUI with initial dimensions
+    root = app.tk.Tk()
+    instrumentation = Instrumentation() if instrumentation_path or overlay else None
+    session = Session(session_path) if session_path else None
+    resumed = session is not None and session.exists()
+    if resumed:
+        app = app.HexagonClusterApp(root, width, height, session.load(), instrumentation)
+    else:
+        app = app.HexagonClusterApp(root, width, height, instrumentation=instrumentation)
+    board = app.hexagon_drawer.board
+
+    # With lattice, hexagons snap onto the cells of the hexagon lattice instead of onto each other
+    if lattice:
+        board.use_lattice()
+
+    if resumed:
+        app.setup_session(session)
+        app.hexagon_drawer.draw_board()
     else:
-        x = 100
-        y += 100
+        if session is not None:
+            session.save(board)
+            app.setup_session(session)
 
-# Bind export to HTML to a button click event to call the export_to_html method in app.py
-export_button = app.setup_export_button()
+        # read source data (elicited information)
+        # the csv file contains two columns: source and elicited information text
+        if affinity:
+            # Grouping by affinity needs all texts before anything can be placed
+            texts = load_elicited_information(csv_path).information
+            app.add_hexagons(affinity_layout(texts, width, board.size))
+        else:
+            # Add hexagons on a grid starting at (100, 100) (in lattice mode, on lattice cells),
+            # chunk by chunk as the file is read
+            layout = functools.partial(lattice_layout, size=board.size) if lattice else grid_layout
+            app.add_hexagons_incrementally(grid_layout_chunks(stream_elicited_information(csv_path), width, layout))
 
-root.mainloop()
+    # Bind export to HTML to a button click event to call the export_to_html method in app.py
+    # (with tiles, the export writes a tile pyramid and its viewer)
+    app.hexagon_drawer.tiled_export = tiles
+    export_button = app.setup_export_button()
+    if overlay:
+        app.setup_overlay()
+
+    root.mainloop()
+    if instrumentation_path:
+        instrumentation.dump(instrumentation_path)
+        print(f"Instrumentation stats written to {instrumentation_path}")
+
+
+# Grid positions for a stream of chunks of (source, information) pairs, one list per chunk
+def grid_layout_chunks(chunks, width, layout=grid_layout):
+    start = 0
+    for chunk in chunks:
+        yield list(layout([information for _, information in chunk], width, start=start))
+        start += len(chunk)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Interactive hexagonal clustering of elicited information")
+    parser.add_argument('--input', default='input/elicited_information.csv',
+                        help="csv file to open in the GUI (columns: source, information)")
+    parser.add_argument('--batch', nargs='+', metavar='CSV',
+                        help="lay out and dock these csv files (glob patterns allowed) without opening the GUI")
+    parser.add_argument('--output-dir', default='output', help="where batch mode writes its exports")
+    parser.add_argument('--workers', type=int, default=None, help="batch worker processes (default: one per core)")
+    parser.add_argument('--affinity', action='store_true',
+                        help="group similar texts into pre-docked clusters instead of a plain grid")
+    parser.add_argument('--png', action='store_true', help="batch mode also writes PNG exports (needs Pillow)")
+    parser.add_argument('--lattice', action='store_true',
+                        help="dock hexagons by snapping them onto the nearest free cell of the hexagon lattice")
+    parser.add_argument('--tiles', action='store_true',
+                        help="export a tile pyramid with a zoomable HTML viewer instead of one SVG/HTML/PNG "
+                             "(for large boards; needs Pillow)")
+    parser.add_argument('--session', metavar='PATH',
+                        help="keep the GUI board in this session file, reopening it if it exists")
+    parser.add_argument('--instrument', nargs='?', const='instrumentation.json', metavar='JSON',
+                        help="time the GUI's hot paths and write the stats to this json file on exit")
+    parser.add_argument('--overlay', action='store_true', help="show frame times and canvas item count on the board")
+    parser.add_argument('--width', type=int, default=900)
+    parser.add_argument('--height', type=int, default=600)
+    arguments = parser.parse_args()
+
+    if arguments.batch:
+        import batch
+        csv_paths = sorted({path for pattern in arguments.batch for path in (glob.glob(pattern) or [pattern])})
+        batch.run_batch(csv_paths, arguments.output_dir, arguments.width, arguments.height, arguments.workers,
+                        arguments.png, arguments.affinity, arguments.tiles, arguments.lattice)
+    else:
+        run_gui(arguments.input, arguments.width, arguments.height, arguments.affinity, arguments.session,
+                arguments.tiles, arguments.instrument, arguments.overlay, arguments.lattice)
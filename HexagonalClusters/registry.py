@@ -0,0 +1,63 @@
+# Compact registry of the hexagons on a board, so that the canvas item ids seen in mouse
+# events resolve to their hexagon in constant time instead of scanning a list
+
+
+# One hexagon: its number, its center and its full text, plus the canvas items drawing it while it
+# is in view (None otherwise). All three canvas items carry the shared tag, so moving the tag moves
+# the whole hexagon. expanded is set while the full text is shown instead of the wrapped one.
+class HexagonRecord:
+    __slots__ = ('number', 'tag', 'hexagon', 'text_id', 'hexagon_number', 'x', 'y', 'text', 'expanded')
+
+    def __init__(self, number, x, y, text):
+        self.number = number
+        self.tag = f"hexagon_{number}"
+        self.hexagon = None  # canvas id of the polygon
+        self.text_id = None  # canvas id of the (wrapped) elicited information text
+        self.hexagon_number = None  # canvas id of the number label
+        self.x = x
+        self.y = y
+        self.text = text
+        self.expanded = False
+
+    @property
+    def realized(self):
+        return self.hexagon is not None
+
+
+class HexagonRegistry:
+    def __init__(self):
+        self.records = {}  # hexagon number -> HexagonRecord, in drawing order
+        self.by_item_id = {}  # any canvas item id of a realized hexagon -> HexagonRecord
+
+    def add(self, record):
+        self.records[record.number] = record
+
+    # Record the canvas items now drawing a hexagon (labels are None when drawn as a plain cell)
+    def attach(self, record, hexagon, text_id=None, hexagon_number=None):
+        record.hexagon = hexagon
+        record.text_id = text_id
+        record.hexagon_number = hexagon_number
+        for item_id in (hexagon, text_id, hexagon_number):
+            if item_id is not None:
+                self.by_item_id[item_id] = record
+
+    # Forget the canvas items of a hexagon that is no longer drawn, returning them for reuse
+    def detach(self, record):
+        items = (record.hexagon, record.text_id, record.hexagon_number)
+        for item_id in items:
+            self.by_item_id.pop(item_id, None)
+        record.hexagon = record.text_id = record.hexagon_number = None
+        return items
+
+    # Resolve the polygon, text or number item id to the hexagon it belongs to (or None)
+    def find(self, item_id):
+        return self.by_item_id.get(item_id)
+
+    def __getitem__(self, number):
+        return self.records[number]
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,157 @@
+# Sessions: a board saved as a compact binary snapshot, plus an append-only journal of what happened
+# to it since (hexagons added, moved, docked, cluster moves and text toggles). Each change appends
+# one short line to the journal, so autosaving never rewrites the board; the journal is folded into
+# a fresh snapshot when the session is saved. Loading maps the snapshot into memory, decodes it in
+# bulk and replays the journal on top of it
+import json
+import mmap
+import os
+import struct
+
+from board import Board
+
+magic = b'HEXB'
+version = 1
+
+# Snapshot layout (little-endian): the header, then one fixed-size entry per hexagon, then the
+# pairs of docked hexagon numbers, then all texts as one UTF-8 blob. Entries locate their text
+# by character offset and length into the decoded blob
+header_format = struct.Struct('<4sHdddIIII')  # magic, version, size, snap distance, docking tolerance,
+#                                               generation, last hexagon number, hexagons, docked pairs
+hexagon_format = struct.Struct('<IddIBII')  # number, x, y, cluster id, flags, text offset, text length
+pair_format = struct.Struct('<II')
+expanded_flag = 1
+
+
+class Session:
+    def __init__(self, path):
+        self.snapshot_path = path
+        self.journal_path = path + '.journal'
+        self.generation = 0  # bumped by every save; the journal is only replayed onto its own snapshot
+        self.journal = None  # journal file, open for appending
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path)
+
+    # Write the whole board as a new snapshot and start an empty journal on top of it. The snapshot
+    # is written to a temporary file first, so a crash leaves either the old or the new one
+    def save(self, board):
+        self.generation += 1
+        records = list(board)
+        docked_pairs = board.docked_pairs()
+        texts = []
+        offset = 0
+        entries = bytearray()
+        for record in records:
+            entries += hexagon_format.pack(record.number, record.x, record.y, board.clusters.find(record.number),
+                                           expanded_flag if record.expanded else 0, offset, len(record.text))
+            texts.append(record.text)
+            offset += len(record.text)
+
+        temporary_path = self.snapshot_path + '.tmp'
+        with open(temporary_path, 'wb') as snapshot:
+            snapshot.write(header_format.pack(magic, version, board.size, board.snap_distance,
+                                              board.docking_tolerance, self.generation, board.hexagon_id,
+                                              len(records), len(docked_pairs)))
+            snapshot.write(entries)
+            snapshot.write(b''.join(pair_format.pack(*pair) for pair in docked_pairs))
+            snapshot.write(''.join(texts).encode('utf-8'))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+        self.start_journal()
+
+    # Load the board: the snapshot, then whatever the journal recorded after it was taken. The
+    # journal stays open, so the session keeps recording changes to the loaded board
+    def load(self):
+        with open(self.snapshot_path, 'rb') as snapshot, \
+                mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            (file_magic, file_version, size, snap_distance, docking_tolerance, self.generation, hexagon_id,
+             count, pair_count) = header_format.unpack_from(mapped)
+            if file_magic != magic or file_version != version:
+                raise ValueError(f"{self.snapshot_path} is not a hexagon board snapshot")
+
+            view = memoryview(mapped)
+            start = header_format.size
+            pairs_start = start + count * hexagon_format.size
+            texts_start = pairs_start + pair_count * pair_format.size
+            try:
+                entries = list(hexagon_format.iter_unpack(view[start:pairs_start]))
+                docked_pairs = pair_format.iter_unpack(view[pairs_start:texts_start])
+                texts = str(view[texts_start:], 'utf-8')
+
+                board = Board(size, snap_distance, docking_tolerance)
+                board.restore(((number, x, y, texts[offset:offset + length], cluster)
+                               for number, x, y, cluster, _, offset, length in entries), docked_pairs)
+            finally:
+                view.release()  # the map cannot close while a view into it is alive
+
+        board.hexagon_id = max(board.hexagon_id, hexagon_id)
+        for number, _, _, _, flags, _, _ in entries:
+            if flags & expanded_flag:
+                board.hexagons[number].expanded = True
+        self.replay(board)
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        return board
+
+    # Apply the journal of the current snapshot to the board. A line cut short by a crash can only
+    # be the last one, and is dropped
+    def replay(self, board):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding='utf-8') as journal:
+            lines = iter(journal)
+            try:
+                operation, generation = json.loads(next(lines, '[]'))
+            except ValueError:
+                return
+            if operation != 'session' or generation != self.generation:
+                return  # left over from before the last save
+            for line in lines:
+                try:
+                    operation, *arguments = json.loads(line)
+                except ValueError:
+                    break
+                if operation == 'add':
+                    number, x, y, text = arguments
+                    board.add(x, y, text, number)
+                elif operation in ('move', 'dock'):
+                    number, x, y = arguments
+                    board.move_to(number, x, y)
+                elif operation == 'move cluster':
+                    numbers, dx, dy = arguments
+                    board.move_many(numbers, dx, dy)
+                elif operation == 'toggle':
+                    number, expanded = arguments
+                    board.hexagons[number].expanded = expanded
+
+    def start_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(self.journal_path, 'w', encoding='utf-8')
+        self.append(('session', self.generation))
+
+    # Append operations, as tuples, to the journal, flushed right away so that they survive a crash
+    def append(self, *operations):
+        self.journal.writelines(json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations)
+        self.journal.flush()
+
+    def added(self, *records):
+        self.append(*(('add', record.number, record.x, record.y, record.text) for record in records))
+
+    def moved(self, record):
+        self.append(('move', record.number, record.x, record.y))
+
+    def docked(self, record):
+        self.append(('dock', record.number, record.x, record.y))
+
+    def moved_cluster(self, numbers, dx, dy):
+        self.append(('move cluster', numbers, dx, dy))
+
+    def toggled(self, record):
+        self.append(('toggle', record.number, record.expanded))
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
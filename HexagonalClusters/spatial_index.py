@@ -0,0 +1,84 @@
+# Uniform grid spatial index over hexagon centers, so that docking only has to look at
+# hexagons that are close enough to the dragged one instead of walking the whole board
+import math
+
+
+class SpatialIndex:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size  # side length of one square bucket, in canvas pixels
+        self.buckets = {}  # (column, row) -> set of keys whose center falls in that bucket
+        self.centers = {}  # key -> (x, y) center currently indexed for that key
+
+    def cell_of(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, key, x, y):
+        self.centers[key] = (x, y)
+        self.buckets.setdefault(self.cell_of(x, y), set()).add(key)
+
+    # Insert many (key, x, y) at once, e.g. when loading a board
+    def insert_many(self, items):
+        cell_size = self.cell_size
+        centers = self.centers
+        buckets = self.buckets
+        for key, x, y in items:
+            centers[key] = (x, y)
+            cell = (math.floor(x / cell_size), math.floor(y / cell_size))
+            if cell in buckets:
+                buckets[cell].add(key)
+            else:
+                buckets[cell] = {key}
+
+    def remove(self, key):
+        x, y = self.centers.pop(key)
+        cell = self.cell_of(x, y)
+        bucket = self.buckets[cell]
+        bucket.discard(key)
+        if not bucket:  # keep the dictionary small on sparse boards
+            del self.buckets[cell]
+
+    def move(self, key, x, y):
+        # Only touch the buckets when the center actually crosses a cell boundary,
+        # which is the rare case for small drag deltas
+        old_cell = self.cell_of(*self.centers[key])
+        new_cell = self.cell_of(x, y)
+        self.centers[key] = (x, y)
+        if old_cell != new_cell:
+            bucket = self.buckets[old_cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[old_cell]
+            self.buckets.setdefault(new_cell, set()).add(key)
+
+    def nearby(self, x, y, radius):
+        # Return the keys whose centers lie within radius of (x, y); only the buckets
+        # overlapping the query square are visited
+        min_column, min_row = self.cell_of(x - radius, y - radius)
+        max_column, max_row = self.cell_of(x + radius, y + radius)
+        radius_squared = radius * radius
+
+        found = []
+        for column in range(min_column, max_column + 1):
+            for row in range(min_row, max_row + 1):
+                for key in self.buckets.get((column, row), ()):
+                    key_x, key_y = self.centers[key]
+                    if (key_x - x) ** 2 + (key_y - y) ** 2 <= radius_squared:
+                        found.append(key)
+        return found
+
+    # Return the keys whose centers lie inside the rectangle (min_x, min_y) - (max_x, max_y)
+    def within(self, min_x, min_y, max_x, max_y):
+        min_column, min_row = self.cell_of(min_x, min_y)
+        max_column, max_row = self.cell_of(max_x, max_y)
+
+        found = []
+        for column in range(min_column, max_column + 1):
+            for row in range(min_row, max_row + 1):
+                for key in self.buckets.get((column, row), ()):
+                    key_x, key_y = self.centers[key]
+                    if min_x <= key_x <= max_x and min_y <= key_y <= max_y:
+                        found.append(key)
+        return found
+
+    def __len__(self):
+        return len(self.centers)
@@ -0,0 +1,67 @@
+# Round trip of a session: snapshot, journal on top of it, a journal line cut short by a crash,
+# and loading it all back. Run with python -m unittest from this directory
+import os
+import tempfile
+import unittest
+
+from board import Board
+from lattice import axial_to_pixel
+from session import Session
+
+
+def board_state(board):
+    return ({record.number: (record.x, record.y, record.text, record.expanded) for record in board},
+            sorted(board.cluster_list()), sorted(board.docked_pairs()), board.hexagon_id)
+
+
+class SessionRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'board.hexb')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_and_journal_round_trip(self):
+        board = Board()
+        # a docked cluster of three, with texts of varying (and non-ASCII) length, and a loose hexagon
+        for (q, r), text in zip([(0, 0), (1, 0), (0, 1)], ['needs', 'défi à relever', '']):
+            board.add(*axial_to_pixel(q, r, board.size), text)
+        board.add(700.5, 400.25, 'loose')
+        board.hexagons[2].expanded = True
+        session = Session(self.path)
+        session.save(board)
+
+        # Changes after the snapshot only go to the journal
+        session.added(board.add(*axial_to_pixel(1, 1, board.size), 'added later'))
+        session.moved(board.move(3, 300, 0))  # separated from the cluster
+        board.hexagons[4].expanded = True
+        session.toggled(board.hexagons[4])
+        session.close()
+        with open(session.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('["move", 1, 12')  # cut short by a crash
+
+        loaded_session = Session(self.path)
+        loaded = loaded_session.load()
+        loaded_session.close()
+        self.assertEqual(board_state(loaded), board_state(board))
+        self.assertEqual(loaded_session.generation, 1)
+        self.assertEqual(sorted(loaded.cluster_list()), [[1, 2, 5]])
+
+    def test_journal_of_an_older_snapshot_is_not_replayed(self):
+        board = Board()
+        board.add(100, 100, 'first')
+        session = Session(self.path)
+        session.save(board)
+        session.close()
+        with open(session.journal_path, 'w', encoding='utf-8') as journal:
+            journal.write('["session", 0]\n["move", 1, 500, 500]\n')
+
+        loaded_session = Session(self.path)
+        loaded = loaded_session.load()
+        loaded_session.close()
+        self.assertEqual((loaded.hexagons[1].x, loaded.hexagons[1].y), (100, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# Text measuring and wrapping from font metrics, instead of creating throwaway canvas text items
+# just to read their bounding boxes
+import functools
+import tkinter.font as tkfont
+
+wrap_cache_size = 4096  # wrapped texts remembered per font
+
+
+class TextMeasurer:
+    def __init__(self, measure):
+        self.measure = measure  # callable returning the width of a string in pixels for one (font, size)
+        self.word_widths = {}  # word -> width in pixels
+        self.space_width = measure(' ')
+        # Wrapped results, keyed by everything the wrapping depends on besides the font itself
+        self.wrap = functools.lru_cache(maxsize=wrap_cache_size)(self._wrap)
+
+    def word_width(self, word):
+        width = self.word_widths.get(word)
+        if width is None:
+            width = self.word_widths[word] = self.measure(word)
+        return width
+
+    # Width of a line of words joined by single spaces, from the cached word widths
+    def width(self, text):
+        words = text.split(' ')
+        return sum(self.word_width(word) for word in words) + self.space_width * (len(words) - 1)
+
+    # A copy of this measurer for use off the Tk thread: it knows the widths measured so far plus
+    # those of the given words (measured now, on the calling thread), and never calls measure again;
+    # unknown words are estimated from the average glyph width seen so far
+    def detached(self, words=()):
+        for word in words:
+            self.word_width(word)
+        word_widths = dict(self.word_widths)
+        word_widths[' '] = self.space_width
+        characters = sum(len(word) for word in word_widths) or 1
+        return TextMeasurer(KnownWidths(word_widths, sum(word_widths.values()) / characters))
+
+    # Measurers can be sent to worker processes (e.g. for tiled exports); the wrap cache stays behind
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['wrap']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.wrap = functools.lru_cache(maxsize=wrap_cache_size)(self._wrap)
+
+    # Split text word by word into lines that fit the given width. Each line contributes
+    # line_height to the text height; once that exceeds max_height, the last line is replaced by
+    # the truncation mark and wrapping stops
+    def _wrap(self, text, width, max_height, line_height, truncation_mark):
+        current_text_height = 0  # record current text height for each wrapped line
+
+        lines = []
+        words = text.split()
+        index = 0
+        while index < len(words):
+            line_width = self.word_width(words[index])
+            line_words = [words[index]]
+            index += 1
+
+            while index < len(words):
+                next_width = line_width + self.space_width + self.word_width(words[index])
+                if next_width > width:
+                    break
+                line_width = next_width
+                line_words.append(words[index])
+                index += 1
+            lines.append(' '.join(line_words) + '\n')  # break lines to fit into hexagon
+
+            current_text_height += line_height
+            # check if current text height exceeds the maximum height:
+            if current_text_height > max_height:
+                # Truncate the last line and break
+                lines[-1] = truncation_mark.strip('\n')  # replace previous line with truncation mark
+                break
+
+        return ''.join(lines)  # concatenate list of lines into a string
+
+
+# Measure function of a detached measurer: known widths, else an estimate from the average glyph width
+class KnownWidths:
+    def __init__(self, widths, character_width):
+        self.widths = widths
+        self.character_width = character_width
+
+    def __call__(self, text):
+        width = self.widths.get(text)
+        return width if width is not None else self.character_width * len(text)
+
+
+# One measurer per (font, size), shared by every canvas and Hexagon using that font
+measurers = {}
+
+
+def tk_text_measurer(widget, font, font_size):
+    measurer = measurers.get((font, font_size))
+    if measurer is None:
+        tk_font = tkfont.Font(root=widget, family=font, size=font_size)
+        measurer = measurers[(font, font_size)] = TextMeasurer(tk_font.measure)
+    return measurer
+
+
+# Without a display there are no font metrics to read, so headless exports (batch mode) measure
+# text by an average glyph width instead: about half an em for Arial-like fonts, with font sizes
+# in points at 96 pixels per inch. Like detached measurers, these can be sent to worker processes
+def approximate_text_measurer(font, font_size, glyph_width=0.5):
+    measurer = measurers.get((font, font_size, 'approximate'))
+    if measurer is None:
+        character_width = glyph_width * font_size * 96 / 72
+        measurer = measurers[(font, font_size, 'approximate')] = TextMeasurer(KnownWidths({}, character_width))
+    return measurer
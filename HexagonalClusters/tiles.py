@@ -0,0 +1,272 @@
+# Tiled export for boards too large for one image: the board is rendered into a pyramid of fixed-size
+# PNG tiles, one level per halving of the resolution, and an HTML viewer fetches only the tiles in
+# view as the reader pans and zooms. Tiles are rendered in parallel worker processes, and a manifest
+# keeps each tile's content hash, so re-exporting only renders the tiles whose hexagons changed
+import hashlib
+import html
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from exporter import draw_hexagon, export_bounds, load_fonts
+
+tile_size = 256  # pixels per tile side
+detail_scale = 0.6  # as Hexagon.detail_zoom: coarser levels only show plain cells
+block_size = 4  # tiles per side of the blocks of neighbouring tiles that are rendered together
+manifest_file = 'manifest.json'
+
+
+# Level k shows the board at scale 1 / 2**k, so each of its tiles covers tile_extent(k) board pixels.
+# The tile grid is anchored at the board origin rather than at the board bounds, so a tile keeps its
+# place (and its hash) when the board grows or shrinks elsewhere
+def tile_extent(level):
+    return tile_size * 2 ** level
+
+
+# Number of levels: down from full resolution until the whole board fits in the extent of one tile
+def level_count(hexagons, style):
+    _, _, width, height = export_bounds(hexagons, style)
+    levels = 1
+    while tile_extent(levels - 1) < max(width, height):
+        levels += 1
+    return levels
+
+
+def tile_path(tiles_dir, level, column, row):
+    return os.path.join(tiles_dir, str(level), f"{column}_{row}.png")
+
+
+# The hexagons each tile of a level shows (any part of), as {(column, row): [hexagons]}
+def tile_contents(hexagons, style, level):
+    extent = tile_extent(level)
+    tiles = {}
+    for hexagon in hexagons:
+        for column in range(math.floor((hexagon.x - style.size) / extent),
+                            math.floor((hexagon.x + style.size) / extent) + 1):
+            for row in range(math.floor((hexagon.y - style.size) / extent),
+                             math.floor((hexagon.y + style.size) / extent) + 1):
+                tiles.setdefault((column, row), []).append(hexagon)
+    return tiles
+
+
+# Hash of everything that shows on a tile: its place, the style and its hexagons (only their
+# centers on levels without labels, where numbers and texts are not drawn)
+def tile_hash(level, column, row, hexagons, style):
+    labels = 0.5 ** level >= detail_scale
+    digest = hashlib.blake2b(repr((tile_size, level, column, row, sorted(vars(style).items()))).encode(),
+                             digest_size=12)
+    for hexagon in sorted(hexagons, key=lambda hexagon: hexagon.number):
+        content = (hexagon.number, hexagon.x, hexagon.y, hexagon.text) if labels else (hexagon.x, hexagon.y)
+        digest.update(repr(content).encode())
+    return digest.hexdigest()
+
+
+# Render some tiles of one level, all within the same block, into tiles_dir; runs in worker processes.
+# The tiles are drawn as one image and cut apart, so that a hexagon overlapping several of them (its
+# text most of all) is drawn once rather than once per tile. Returns how many tiles were rendered
+def render_block(level, tiles, hexagons, style, measurer, tiles_dir):
+    from PIL import Image, ImageDraw, ImageFont
+
+    scale = 0.5 ** level
+    fonts = load_fonts(ImageFont, style, scale) if scale >= detail_scale else None
+    first_column = min(column for column, _ in tiles)
+    first_row = min(row for _, row in tiles)
+    columns = max(column for column, _ in tiles) - first_column + 1
+    rows = max(row for _, row in tiles) - first_row + 1
+    left = first_column * tile_extent(level)
+    top = first_row * tile_extent(level)
+
+    image = Image.new('RGB', (columns * tile_size, rows * tile_size), 'white')
+    draw = ImageDraw.Draw(image)
+    for hexagon in hexagons:
+        draw_hexagon(draw, hexagon, (hexagon.x - left) * scale, (hexagon.y - top) * scale, style, measurer, fonts,
+                     scale)
+    os.makedirs(os.path.join(tiles_dir, str(level)), exist_ok=True)
+    for column, row in tiles:
+        x = (column - first_column) * tile_size
+        y = (row - first_row) * tile_size
+        image.crop((x, y, x + tile_size, y + tile_size)).save(tile_path(tiles_dir, level, column, row))
+    return len(tiles)
+
+
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as manifest:
+            return json.load(manifest)['tiles']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_manifest(manifest_path, levels, bounds, tiles):
+    with open(manifest_path, 'w', encoding='utf-8') as manifest:
+        json.dump({'tile_size': tile_size, 'levels': levels, 'bounds': bounds, 'tiles': tiles}, manifest)
+
+
+# Export hexagons (board snapshots) as a tile pyramid in tiles_dir plus an HTML viewer at html_path
+# showing it in a width x height box. Only tiles that are new, or whose hash differs from the
+# previous export's manifest, are rendered, spread over workers processes (default: one per core;
+# with workers=1, in this process). Tiles no longer showing any hexagon are removed. Needs Pillow,
+# which is optional: returns no paths (and says so) when it is not installed. progress, if given,
+# is called with (done, total) tiles and may abort the export by raising. Returns the paths written
+def export_tiles(hexagons, style, measurer, tiles_dir, html_path, width, height, workers=None, progress=None):
+    if importlib.util.find_spec('PIL') is None:
+        print("Pillow is not installed, so no tiles were written (the SVG export does not need it).")
+        return []
+
+    hexagons = list(hexagons)
+    os.makedirs(tiles_dir, exist_ok=True)
+    manifest_path = os.path.join(tiles_dir, manifest_file)
+    previous = read_manifest(manifest_path)
+    levels = level_count(hexagons, style)
+    bounds = export_bounds(hexagons, style)
+
+    # Changed tiles are collected per block, with the hexagons they show, as one task each
+    hashes = {}
+    blocks = {}  # (level, block column, block row) -> (tiles, {number: hexagon})
+    for level in range(levels):
+        for (column, row), contents in tile_contents(hexagons, style, level).items():
+            key = f"{level}/{column}_{row}"
+            hashes[key] = tile_hash(level, column, row, contents, style)
+            if previous.get(key) != hashes[key] or not os.path.exists(tile_path(tiles_dir, level, column, row)):
+                tiles, block_hexagons = blocks.setdefault((level, column // block_size, row // block_size), ([], {}))
+                tiles.append((column, row))
+                block_hexagons.update((hexagon.number, hexagon) for hexagon in contents)
+    for key in previous.keys() - hashes.keys():
+        level, position = key.split('/')
+        try:
+            os.remove(tile_path(tiles_dir, level, *position.split('_')))
+        except OSError:
+            pass
+
+    # Until every changed tile is rendered, the manifest only vouches for the unchanged ones, so an
+    # export that is aborted half-way leaves nothing behind that the next one would wrongly keep
+    unchanged = {key: tile for key, tile in hashes.items() if previous.get(key) == tile}
+    write_manifest(manifest_path, levels, bounds, unchanged)
+    tasks = [(level, tiles, list(block_hexagons.values()), style, measurer, tiles_dir)
+             for (level, _, _), (tiles, block_hexagons) in blocks.items()]
+    total = sum(len(task[1]) for task in tasks)
+    done = 0
+    if progress is not None:
+        progress(done, total)
+    if workers == 1:
+        for task in tasks:
+            done += render_block(*task)
+            if progress is not None:
+                progress(done, total)
+    elif tasks:
+        # A task that cannot be sent to a worker process leaves as_completed waiting for good rather
+        # than failing, so the style and measurer every task carries are checked up front. Workers
+        # are spawned rather than forked: exports run on a thread of the GUI process, and a fork
+        # there could copy locks held by the Tk thread into the workers
+        pickle.dumps((style, measurer))
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            for future in as_completed([pool.submit(render_block, *task) for task in tasks]):
+                done += future.result()
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            pool.shutdown(cancel_futures=True)
+    write_manifest(manifest_path, levels, bounds, hashes)
+
+    with open(html_path, 'w', encoding='utf-8') as html_file:
+        tiles_url = os.path.relpath(tiles_dir, os.path.dirname(os.path.abspath(html_path))).replace(os.sep, '/')
+        html_file.write(tile_viewer_document(tiles_url, levels, bounds, hashes, width, height))
+    return [html_path, manifest_path]
+
+
+# An HTML page to pan (drag) and zoom (mouse wheel) around a tile pyramid in a width x height box.
+# It shows the level matching the zoom, and only loads the tiles that are in view; tile URLs carry
+# their hash, so the browser cache never serves a tile that was re-rendered
+def tile_viewer_document(tiles_url, levels, bounds, tiles, width, height, title='Hexagon Layout'):
+    board = json.dumps({'url': tiles_url, 'tileSize': tile_size, 'levels': levels, 'bounds': bounds,
+                        'tiles': tiles})
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{html.escape(title)}</title>
+</head>
+<body>
+    <div id="viewer" style="position:relative; width:{width}px; height:{height}px; overflow:hidden;
+                            border:1px solid #eee; background:white; cursor:grab; touch-action:none;"></div>
+    <script>
+    const board = {board};
+    const viewer = document.getElementById('viewer');
+    const shown = new Map();  // tile key -> img element
+    const [boardX, boardY, boardWidth, boardHeight] = board.bounds;
+    const minZoom = 1 / 2 ** board.levels, maxZoom = 4;
+    let zoom = Math.min(1, viewer.clientWidth / boardWidth, viewer.clientHeight / boardHeight);
+    let left = boardX, top = boardY;  // board point at the top left corner of the viewer
+    let frame = null;
+
+    function render() {{
+        frame = null;
+        const level = Math.max(0, Math.min(board.levels - 1, Math.floor(Math.log2(1 / zoom))));
+        const extent = board.tileSize * 2 ** level;
+        const right = left + viewer.clientWidth / zoom, bottom = top + viewer.clientHeight / zoom;
+        const wanted = new Set();
+        for (let column = Math.floor(left / extent); column * extent < right; column++) {{
+            for (let row = Math.floor(top / extent); row * extent < bottom; row++) {{
+                const key = `${{level}}/${{column}}_${{row}}`;
+                if (!(key in board.tiles)) continue;
+                wanted.add(key);
+                let image = shown.get(key);
+                if (!image) {{
+                    image = document.createElement('img');
+                    image.src = `${{board.url}}/${{key}}.png?${{board.tiles[key]}}`;
+                    image.draggable = false;
+                    image.style.position = 'absolute';
+                    viewer.appendChild(image);
+                    shown.set(key, image);
+                }}
+                image.style.left = `${{(column * extent - left) * zoom}}px`;
+                image.style.top = `${{(row * extent - top) * zoom}}px`;
+                image.style.width = image.style.height = `${{extent * zoom}}px`;
+            }}
+        }}
+        for (const [key, image] of shown) {{
+            if (!wanted.has(key)) {{
+                image.remove();
+                shown.delete(key);
+            }}
+        }}
+    }}
+
+    function schedule() {{
+        if (frame === null) frame = requestAnimationFrame(render);
+    }}
+
+    let drag = null;
+    viewer.addEventListener('pointerdown', event => {{
+        drag = {{x: event.clientX, y: event.clientY}};
+        viewer.setPointerCapture(event.pointerId);
+    }});
+    viewer.addEventListener('pointermove', event => {{
+        if (drag === null) return;
+        left -= (event.clientX - drag.x) / zoom;
+        top -= (event.clientY - drag.y) / zoom;
+        drag = {{x: event.clientX, y: event.clientY}};
+        schedule();
+    }});
+    viewer.addEventListener('pointerup', () => drag = null);
+    viewer.addEventListener('wheel', event => {{
+        event.preventDefault();
+        // Zoom around the pointer: the board point under it stays in place
+        const box = viewer.getBoundingClientRect();
+        const x = event.clientX - box.left, y = event.clientY - box.top;
+        const boardPointX = left + x / zoom, boardPointY = top + y / zoom;
+        zoom = Math.min(maxZoom, Math.max(minZoom, zoom * (event.deltaY < 0 ? 1.25 : 0.8)));
+        left = boardPointX - x / zoom;
+        top = boardPointY - y / zoom;
+        schedule();
+    }}, {{passive: false}});
+    render();
+    </script>
+</body>
+</html>
+"""